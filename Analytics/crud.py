@@ -0,0 +1,219 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import logging
+
+from pymongo import DESCENDING, DeleteMany, ReplaceOne, UpdateOne
+
+from db_config import (
+    invoices_collection,
+    products_collection,
+    sales_rollups_collection
+)
+
+
+log = logging.getLogger(__name__)
+
+# Rollup Documents:
+#   {"scope": "total", "key": 0, "day": "2024-01-31", "revenue", "units", "invoices"}
+#   {"scope": "category", "key": <category_id>, "day", "revenue", "units"}
+#   {"scope": "product", "key": <product_id>, "day", "revenue", "units"}
+def ensure_indexes():
+    """
+        Create the Indexes Used by Rollup Reads and Upserts
+    """
+    sales_rollups_collection.create_index(
+        [("scope", 1), ("key", 1), ("day", 1)],
+        unique=True
+    )
+    sales_rollups_collection.create_index([("scope", 1), ("day", 1)])
+
+
+def day_of(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+def product_categories(product_ids: List[int]) -> dict:
+    """
+        {product_id: category_id} with One Query
+    """
+    return {
+        product["id"]: product.get("category", 0)
+        for product in products_collection.find(
+            {"id": {"$in": list(product_ids)}},
+            {"_id": 0, "id": 1, "category": 1}
+        )
+    }
+
+
+def rollup_documents(day: str, totals: dict, categories: dict, products: dict) -> List[dict]:
+    """
+        The Rollup Documents of One Day
+    """
+    documents = [{"scope": "total", "key": 0, "day": day, **totals}]
+    for scope, values in (("category", categories), ("product", products)):
+        documents.extend(
+            {"scope": scope, "key": key, "day": day, **value}
+            for key, value in values.items()
+        )
+    return documents
+
+
+# ----------- { INCREMENTAL Functionalities } -----------
+def record_invoice(invoice: dict):
+    """
+        Add A Registered Invoice to Its Day's Rollups (One bulk_write)
+    """
+    products = {}
+    for item in invoice.get("items", []):
+        line = products.setdefault(item["id"], {"revenue": 0, "units": 0})
+        line["revenue"] += item["unit_price"] * item["quantity"]
+        line["units"] += item["quantity"]
+
+    categories = {}
+    for product_id, category_id in product_categories(products).items():
+        line = categories.setdefault(category_id, {"revenue": 0, "units": 0})
+        line["revenue"] += products[product_id]["revenue"]
+        line["units"] += products[product_id]["units"]
+
+    totals = {
+        "revenue": invoice.get("total", 0),
+        "units": invoice.get("amounts", 0),
+        "invoices": 1,
+    }
+    day = day_of(invoice.get("registered_at") or datetime.now())
+    requests = [
+        UpdateOne(
+            {"scope": document.pop("scope"), "key": document.pop("key"), "day": document.pop("day")},
+            {"$inc": document},
+            upsert=True
+        )
+        for document in rollup_documents(day, totals, categories, products)
+    ]
+    try:
+        sales_rollups_collection.bulk_write(requests, ordered=False)
+    except Exception:
+        # The Nightly Rebuild Recomputes the Day
+        log.exception("Sales Rollup Update Failed", extra={"invoice_id": invoice.get("id")})
+
+
+# ----------- { REBUILD Functionalities } -----------
+def rebuild_rollups(since: date, until: date) -> int:
+    """
+        Recompute the Rollups of Closed Days [since, until] from the Invoices
+
+        `until` is capped at yesterday: today's rollups are still receiving
+        increments from record_invoice. Rollups are replaced in place and
+        the ones no longer backed by invoices are deleted, so overlapping
+        rebuilds can't collide on the unique rollup index.
+    """
+    until = min(until, date.today() - timedelta(days=1))
+    if since > until:
+        return 0
+    start = datetime.combine(since, datetime.min.time())
+    end = datetime.combine(until + timedelta(days=1), datetime.min.time())
+    match = {"$match": {"registered_at": {"$gte": start, "$lt": end}}}
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$registered_at"}}
+
+    totals = {
+        row["_id"]: {"revenue": row["revenue"], "units": row["units"], "invoices": row["invoices"]}
+        for row in invoices_collection.aggregate([
+            match,
+            {"$group": {
+                "_id": day,
+                "revenue": {"$sum": "$total"},
+                "units": {"$sum": "$amounts"},
+                "invoices": {"$sum": 1},
+            }},
+        ])
+    }
+
+    products = {}
+    for row in invoices_collection.aggregate([
+        match,
+        {"$unwind": "$items"},
+        {"$group": {
+            "_id": {"day": day, "product": "$items.id"},
+            "revenue": {"$sum": {"$multiply": ["$items.unit_price", "$items.quantity"]}},
+            "units": {"$sum": "$items.quantity"},
+        }},
+    ]):
+        products.setdefault(row["_id"]["day"], {})[row["_id"]["product"]] = {
+            "revenue": row["revenue"],
+            "units": row["units"],
+        }
+
+    categories_of = product_categories({
+        product_id for lines in products.values() for product_id in lines
+    })
+    documents = []
+    for rollup_day, rollup_totals in totals.items():
+        day_products = products.get(rollup_day, {})
+        day_categories = {}
+        for product_id, line in day_products.items():
+            category = day_categories.setdefault(
+                categories_of.get(product_id, 0),
+                {"revenue": 0, "units": 0}
+            )
+            category["revenue"] += line["revenue"]
+            category["units"] += line["units"]
+        documents.extend(
+            rollup_documents(rollup_day, rollup_totals, day_categories, day_products)
+        )
+
+    requests = [
+        ReplaceOne(
+            {"scope": document["scope"], "key": document["key"], "day": document["day"]},
+            document,
+            upsert=True
+        )
+        for document in documents
+    ]
+    keys = {}
+    for document in documents:
+        keys.setdefault((document["day"], document["scope"]), []).append(document["key"])
+    for offset in range((until - since).days + 1):
+        rollup_day = (since + timedelta(days=offset)).isoformat()
+        for scope in ("total", "category", "product"):
+            requests.append(DeleteMany({
+                "day": rollup_day,
+                "scope": scope,
+                "key": {"$nin": keys.get((rollup_day, scope), [])},
+            }))
+    sales_rollups_collection.bulk_write(requests, ordered=False)
+    return len(documents)
+
+
+def rebuild_yesterday():
+    """
+        Scheduled Rebuild of the Last Closed Day
+    """
+    yesterday = date.today() - timedelta(days=1)
+    return rebuild_rollups(yesterday, yesterday)
+
+
+# ----------- { READ Functionalities } -----------
+def sales(scope: str, since: date, until: date, key: Optional[int] = None) -> List[dict]:
+    """
+        Rollup Documents of A Scope, Oldest Day First
+    """
+    query = {"scope": scope, "day": {"$gte": since.isoformat(), "$lte": until.isoformat()}}
+    if key is not None:
+        query["key"] = key
+    return list(
+        sales_rollups_collection.find(query, {"_id": 0}).sort([("day", 1), ("key", 1)])
+    )
+
+
+def top_sellers(scope: str, since: date, until: date, limit: int = 10) -> List[dict]:
+    """
+        Categories or Products with the Most Revenue over A Range of Days
+    """
+    return [
+        {"key": row["_id"], "revenue": row["revenue"], "units": row["units"]}
+        for row in sales_rollups_collection.aggregate([
+            {"$match": {"scope": scope, "day": {"$gte": since.isoformat(), "$lte": until.isoformat()}}},
+            {"$group": {"_id": "$key", "revenue": {"$sum": "$revenue"}, "units": {"$sum": "$units"}}},
+            {"$sort": {"revenue": DESCENDING}},
+            {"$limit": limit},
+        ])
+    ]
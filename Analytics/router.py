@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from . import crud
+import auth
+
+
+analyticsRouter = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+security = HTTPBearer()
+auth_handler = auth.Auth()
+
+
+def date_range(since: Optional[date], until: Optional[date]):
+    """
+        Default to the Last 30 Days
+    """
+    until = until or date.today()
+    since = since or until - timedelta(days=29)
+    if since > until:
+        raise HTTPException(400, "`since` Is After `until`!")
+    if (until - since).days > 366:
+        raise HTTPException(400, "The Range Is Limited to One Year!")
+    return since, until
+
+
+def check_admin(credentials: HTTPAuthorizationCredentials):
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+
+# ----------- { SALES Endpoints } -----------
+@analyticsRouter.get("/sales")
+def daily_sales(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    since: Optional[date] = None,
+    until: Optional[date] = None
+):
+    """
+        Revenue, Units and Invoices per Day
+    """
+    check_admin(credentials)
+    return crud.sales("total", *date_range(since, until))
+
+
+@analyticsRouter.get("/sales/categories")
+def category_sales(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    category_id: Optional[int] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None
+):
+    """
+        Revenue and Units per Category per Day
+    """
+    check_admin(credentials)
+    return crud.sales("category", *date_range(since, until), key=category_id)
+
+
+@analyticsRouter.get("/sales/products")
+def product_sales(
+    product_id: int,
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    since: Optional[date] = None,
+    until: Optional[date] = None
+):
+    """
+        Revenue and Units of A Product per Day
+    """
+    check_admin(credentials)
+    return crud.sales("product", *date_range(since, until), key=product_id)
+
+
+@analyticsRouter.get("/sales/top")
+def top_sellers(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    scope: str = Query("product", regex="^(product|category)$"),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    limit: int = Query(10, gt=0, le=100)
+):
+    """
+        Best-Selling Products or Categories (by Revenue) over A Range
+    """
+    check_admin(credentials)
+    return crud.top_sellers(scope, *date_range(since, until), limit=limit)
+
+
+@analyticsRouter.post("/sales/rebuild")
+async def rebuild(
+    since: date,
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    until: Optional[date] = None
+):
+    """
+        Recompute Closed Days' Rollups from the Invoices (Backfills, Corrections)
+    """
+    check_admin(credentials)
+    # Today Is Still Being Recorded Incrementally, Only Closed Days Are Rebuilt
+    yesterday = date.today() - timedelta(days=1)
+    since, until = date_range(since, min(until or yesterday, yesterday))
+    documents = await run_in_threadpool(crud.rebuild_rollups, since, until)
+    return {"since": since, "until": until, "documents": documents}
@@ -73,7 +73,13 @@ def register_user(user: schemas.UserAuth, cart_index: str, user_type: str = "CL"
         "cart_index": cart_index,
     }
 
-    return users_collection.insert_one(db_user).inserted_id
+    inserted_id = users_collection.insert_one(db_user).inserted_id
+    # An Owned Cart Is Neither Expired Nor Archived As Anonymous
+    carts_collection.update_one(
+        {"cart_index": cart_index, "user_id": {"$in": [0, None]}},
+        {"$set": {"user_id": db_user["id"]}}
+    )
+    return inserted_id
 
 
 # ---------------------------------------------------------------------
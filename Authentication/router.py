@@ -1,11 +1,12 @@
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Security
+from fastapi import APIRouter, HTTPException, Request, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 import auth
 from . import crud, schemas
-from Shop.crud import get_cart
+from rate_limit import login_limiter, retry_after
+from Shop.crud import merge_carts
 
 authRouter = APIRouter(
     prefix="/user",
@@ -67,10 +68,24 @@ async def sign_up(user: schemas.UserAuth, cart_index: str, user_type: str = "CL"
 
 
 @authRouter.post("/auth/login")
-async def sign_in(user: schemas.UserAuth):
+def sign_in(user: schemas.UserAuth, request: Request, cart_index: str = ""):
+    """
+        Login, Merging the Anonymous Cart (cart_index) into the User's Cart
+    """
+    # Throttled Before Any Lookup or bcrypt (uvicorn Resolves X-Forwarded-For)
+    client_ip = request.client.host if request.client else ""
+    wait = login_limiter.check(user.mobile, client_ip)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too Many Login Attempts, Try Again Later!",
+            headers={"Retry-After": retry_after(wait)}
+        )
+
     db_user = crud.get_user_by_mobile(user.mobile)
 
     if not db_user:
+        login_limiter.failed(user.mobile, client_ip)
         raise HTTPException(
             status_code=401,
             detail=f"Mobile ({user.mobile}) Is Not Registered Yet!"
@@ -86,12 +101,14 @@ async def sign_in(user: schemas.UserAuth):
             db_user["user_type"]
         )
         refresh_token = auth_handler.encode_refresh_token(user.mobile)
+        login_limiter.succeeded(user.mobile)
 
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
-            "cart": None}
+            "cart": merge_carts(db_user, cart_index)}
 
+    login_limiter.failed(user.mobile, client_ip)
     raise HTTPException(
         status_code=401,
         detail=f"Password is WRONG!"
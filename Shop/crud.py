@@ -1,37 +1,230 @@
 from string import ascii_lowercase, ascii_uppercase, digits
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from typing import Iterable, List, Optional
+import csv
+import io
+import json
+import logging
 import random
+import time
 
-import boto3
 from decouple import config
 from fastapi import UploadFile
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import DeleteOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from . import schemas
 from db_config import (
     carts_collection,
+    carts_archive_collection,
+    catalog_categories_collection,
+    catalog_products_collection,
     categories_collection,
     comments_collection,
+    counters_collection,
     products_collection,
     invoices_collection,
     messages_collection,
-    address_collection
+    address_collection,
+    reservations_collection,
+    users_collection
 )
 
 
+log = logging.getLogger(__name__)
+
 CHARS = list(ascii_lowercase + ascii_uppercase + digits)
-STORAGE_URL = config('ARVAN_BASE_URL')
-BUCKET_INVOICES = config("BUCKET_INVOICES")
-BUCKET_PRODUCTS = config("BUCKET_PRODUCTS")
-client = boto3.resource(
-    service_name="s3",
-    endpoint_url=STORAGE_URL,
-    aws_access_key_id=config("ARVAN_CLOUD_ACCESS_KEY"),
-    aws_secret_access_key=config("ARVAN_CLOUD_SECRET_KEY")
-)
+EPOCH = datetime(1970, 1, 1)
+# Category Membership Model:
+#   embedded => Product IDs Are $push-ed into category["products"] (Legacy)
+#   indexed  => Listings Come from the products.category Index and Only
+#               category["product_count"] Is Maintained
+CATEGORY_MEMBERSHIP = config("CATEGORY_MEMBERSHIP", default="embedded")
+# Seconds A Checkout May Hold Stock Before It's Released
+RESERVATION_TTL = config("RESERVATION_TTL", default=900, cast=int)
+# Seconds Closed Reservations Are Kept Before the TTL Index Removes Them
+RESERVATION_RETENTION = config("RESERVATION_RETENTION", default=86400, cast=int)
+PRODUCT_PROJECTION = {"_id": 0, "pending_reservations": 0}
+# Message Intake: direct (One insert_one per Message) | buffered (Batched)
+MESSAGE_INTAKE = config("MESSAGE_INTAKE", default="direct")
+MESSAGE_BATCH_SIZE = config("MESSAGE_BATCH_SIZE", default=100, cast=int)
+MESSAGE_FLUSH_MS = config("MESSAGE_FLUSH_MS", default=200, cast=int)
+MESSAGE_QUEUE_SIZE = config("MESSAGE_QUEUE_SIZE", default=10000, cast=int)
+MESSAGE_ENQUEUE_TIMEOUT_MS = config("MESSAGE_ENQUEUE_TIMEOUT_MS", default=50, cast=int)
+# Seconds An Empty Anonymous Cart Lives after Its Last Change
+CART_EMPTY_TTL = config("CART_EMPTY_TTL", default=7 * 86400, cast=int)
+# Days after Which Untouched Non-Empty Carts Move to carts_archive
+CART_ARCHIVE_AFTER_DAYS = config("CART_ARCHIVE_AFTER_DAYS", default=30, cast=int)
+CART_ARCHIVE_BATCH = config("CART_ARCHIVE_BATCH", default=1000, cast=int)
+# Product Fields Partners Can Export (Internal Fields Are Never Exported)
+EXPORT_FIELDS = [
+    "id", "title", "slug", "category", "description", "unit_price", "stock",
+    "score", "offer", "cover", "images", "released_at", "updated_at",
+]
+# Rows Validated and Written per bulk_write of A Product Import
+IMPORT_BATCH_SIZE = config("IMPORT_BATCH_SIZE", default=1000, cast=int)
+STORAGE_URL = config('ARVAN_BASE_URL', default="")
+BUCKET_INVOICES = config("BUCKET_INVOICES", default="")
+BUCKET_PRODUCTS = config("BUCKET_PRODUCTS", default="")
+
+_storage = None
+_storage_lock = Lock()
+
+
+def get_storage():
+    """
+        S3 Client for Arvan Cloud (Created on First Upload)
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                # boto3 Is Slow to Import, Keep It Off the Startup Path
+                import boto3
+                _storage = boto3.resource(
+                    service_name="s3",
+                    endpoint_url=STORAGE_URL,
+                    aws_access_key_id=config("ARVAN_CLOUD_ACCESS_KEY"),
+                    aws_secret_access_key=config("ARVAN_CLOUD_SECRET_KEY")
+                )
+    return _storage
+
+
+# ----------- { COUNTER Functionalities } -----------
+def allocate_ids(name: str, count: int = 1, last_id=None) -> range:
+    """
+        Reserve A Block of `count` Consecutive IDs (One Round Trip)
+
+        A missing counter starts from `last_id()` (the highest id in use),
+        so existing documents never collide with allocated ids.
+    """
+    if count <= 0:
+        return range(0)
+    for _ in range(2):
+        counter = counters_collection.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"value": count}},
+            return_document=ReturnDocument.AFTER
+        )
+        if counter:
+            return range(counter["value"] - count + 1, counter["value"] + 1)
+        # $max Keeps Concurrent Initializations Consistent
+        counters_collection.update_one(
+            {"_id": name},
+            {"$max": {"value": last_id() if last_id else 0}},
+            upsert=True
+        )
+    raise RuntimeError(f"Counter ({name}) Could Not Be Initialized!")
+
+
+# ----------- { INDEX Functionalities } -----------
+def ensure_unique_index(collection, field: str, **options):
+    """
+        Create A Unique Index, Replacing A Non-Unique One on the Same Field
+
+        Raises RuntimeError, before touching the existing index, while the
+        collection still holds duplicates; if the build fails anyway (e.g. a
+        duplicate written meanwhile) the previous index is put back.
+    """
+    name = f"{field}_1"
+    index = collection.index_information().get(name)
+    if index and index.get("unique") and (
+        index.get("partialFilterExpression") == options.get("partialFilterExpression")
+    ):
+        return
+
+    duplicate = next(collection.aggregate([
+        {"$match": options.get("partialFilterExpression", {})},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 1},
+    ], allowDiskUse=True), None)
+    if duplicate:
+        raise RuntimeError(
+            f"Unique Index ({collection.name}.{name}) Was Not Built: "
+            f"{duplicate['count']} Documents Share {field}={duplicate['_id']!r}"
+        )
+
+    # MongoDB Can't Keep Both (Same Key, Different Uniqueness), So the Old One Is Dropped First
+    if index:
+        collection.drop_index(name)
+    try:
+        collection.create_index([(field, 1)], unique=True, name=name, **options)
+    except Exception:
+        if index:
+            collection.create_index(
+                index["key"],
+                name=name,
+                **{option: index[option] for option in ("unique", "partialFilterExpression") if option in index}
+            )
+        raise
+
+
+def ensure_unique_indexes():
+    """
+        Create the Unique Indexes (Separately, As Duplicates Can Block Them)
+    """
+    # Imports Are Keyed by Slug (Legacy Products Without One Are Left Out)
+    ensure_unique_index(
+        products_collection,
+        "slug",
+        partialFilterExpression={"slug": {"$type": "string"}}
+    )
+    ensure_unique_index(carts_collection, "cart_index")
+    ensure_unique_index(messages_collection, "id")
+
+
+def ensure_indexes():
+    """
+        Create the Indexes Used by Shop Queries
+    """
+    categories_collection.create_index([("id", 1)])
+    products_collection.create_index([("id", -1)])
+    products_collection.create_index([("category", 1), ("id", -1)])
+    # Incremental Exports
+    products_collection.create_index([("released_at", 1)])
+    products_collection.create_index([("updated_at", 1)])
+    carts_collection.create_index([("last_modified", 1), ("amounts", 1)])
+    carts_collection.create_index(
+        [("last_modified", 1)],
+        expireAfterSeconds=CART_EMPTY_TTL,
+        partialFilterExpression={"amounts": 0, "user_id": 0},
+        name="empty_anonymous_carts_ttl"
+    )
+    invoices_collection.create_index([("idempotency_key", 1)], unique=True)
+    invoices_collection.create_index([("cart_index", 1)], unique=True)
+    messages_collection.create_index([("responded", 1), ("date", -1), ("id", -1)])
+    messages_collection.create_index([("mesaage_index", 1)])
+    reservations_collection.create_index([("reservation_id", 1)], unique=True)
+    # At Most One Held Reservation per Cart
+    reservations_collection.create_index(
+        [("cart_index", 1)],
+        unique=True,
+        partialFilterExpression={"status": "held"},
+        name="held_reservation_per_cart"
+    )
+    reservations_collection.create_index([("status", 1), ("expires_at", 1)])
+    invoices_collection.create_index([("reservation_id", 1)])
+    reservations_collection.create_index(
+        [("closed_at", 1)],
+        expireAfterSeconds=RESERVATION_RETENTION
+    )
 
 
 # ----------- { CATEGORY Functionalities } -----------
+def category_projection() -> dict:
+    """
+        Category Projection (Without the Products Array in Indexed Mode)
+    """
+    if CATEGORY_MEMBERSHIP == "indexed":
+        return {"_id": 0, "products": 0}
+    return {"_id": 0}
+
+
 def get_last_category_id() -> int:
     """
         Get Last Category ID
@@ -49,7 +242,7 @@ def categories(skip: int = 0, limit: int = 12) -> List[dict]:
     """
     return [
         category
-        for category in categories_collection.find({}, {"_id": 0}).sort([("id", 1)]).skip(skip).limit(limit)
+        for category in catalog_categories_collection.find({}, category_projection()).sort([("id", 1)]).skip(skip).limit(limit)
     ]
 
 
@@ -58,16 +251,15 @@ def create_new_category(title: str):
         Create A New Category
     """
     last_id = get_last_category_id()
-    created_at = datetime.now()
     category = {
         "id":  last_id + 1,
         "title": title,
-        "products": []
+        "product_count": 0,
     }
+    if CATEGORY_MEMBERSHIP != "indexed":
+        category["products"] = []
     category_db = categories_collection.insert_one(category)
-    print(
-        f"A New Category Was Created by ID ({category_db.inserted_id}) <=> {last_id + 1} [{created_at}]"
-    )
+    log.info("Category Created", extra={"category_id": last_id + 1})
     return category_db
 
 
@@ -75,29 +267,76 @@ def get_category(category_id: int):
     """
         Find A Category by ProductID
     """
-    return categories_collection.find_one({"id": category_id}, {"_id": 0})
+    return catalog_categories_collection.find_one({"id": category_id}, category_projection())
 
 
 def add_new_product_to_category(product_id: int, category_id: int):
     """
-        Create A New Category
+        Add A Product to A Category
     """
-    return categories_collection.find_one_and_update(
+    update = {"$inc": {"product_count": 1}}
+    if CATEGORY_MEMBERSHIP != "indexed":
+        update["$push"] = {"products": product_id}
+
+    return categories_collection.update_one(
         {"id": category_id},
-        {'$push': {'products': product_id}},
-        {"_id": 0},
+        update,
         upsert=True
     )
 
 
+def update_category_members(added: dict, removed: dict):
+    """
+        Apply Membership Changes of Many Products ({category_id: [product_id]})
+        with One Update per Category
+    """
+    requests = []
+    for category_id in set(added) | set(removed):
+        added_ids = added.get(category_id, [])
+        removed_ids = removed.get(category_id, [])
+        update = {"$inc": {"product_count": len(added_ids) - len(removed_ids)}}
+        if CATEGORY_MEMBERSHIP != "indexed":
+            if added_ids:
+                update["$push"] = {"products": {"$each": added_ids}}
+            if removed_ids:
+                update["$pull"] = {"products": {"$in": removed_ids}}
+        requests.append(UpdateOne({"id": category_id}, update, upsert=True))
+
+    if not requests:
+        return None
+    return categories_collection.bulk_write(requests, ordered=False)
+
+
+def rebuild_category_counts():
+    """
+        Recount category["product_count"] from the Products Collection
+    """
+    counts = {
+        count["_id"]: count["count"]
+        for count in products_collection.aggregate([
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+        ])
+    }
+    requests = [
+        UpdateOne({"id": category_id}, {"$set": {"product_count": count}})
+        for category_id, count in counts.items()
+    ]
+    # Categories Left without Products
+    requests.append(UpdateMany(
+        {"id": {"$nin": list(counts)}, "product_count": {"$ne": 0}},
+        {"$set": {"product_count": 0}}
+    ))
+    return categories_collection.bulk_write(requests, ordered=False)
+
+
 # ----------- { PRODUCT Functionalities } -----------
 def save_product_image(image: UploadFile, image_key: str):
     """
         Upload A Product Image
     """
     image_url = ""
-    bucket = client.Bucket(BUCKET_PRODUCTS)
     try:
+        bucket = get_storage().Bucket(BUCKET_PRODUCTS)
         bucket.upload_fileobj(
             image.file,
             image_key,
@@ -105,7 +344,7 @@ def save_product_image(image: UploadFile, image_key: str):
         )
         image_url = f"{STORAGE_URL}/{BUCKET_PRODUCTS}/{image_key}"
     except Exception:
-        pass
+        log.warning("Product Image Upload Failed", exc_info=True, extra={"image_key": image_key})
 
     return image_url
 
@@ -127,7 +366,7 @@ def products(skip: int = 0, limit: int = 12) -> List[dict]:
     """
     return [
         product
-        for product in products_collection.find({}, {"_id": 0}).sort([("id", -1)]).skip(skip).limit(limit)
+        for product in catalog_products_collection.find({}, PRODUCT_PROJECTION).sort([("id", -1)]).skip(skip).limit(limit)
     ]
 
 
@@ -135,12 +374,11 @@ def create_new_product(product: schemas.ProductRequest):
     """
         Create A New Product
     """
-    last_id = get_last_product_id()
-    add_new_product_to_category(last_id + 1, product.category)
+    product_id = allocate_ids("products", 1, get_last_product_id)[0]
 
-    created_at = datetime.now()
+    now = datetime.now()
     product_db = {
-        "id":  last_id + 1,
+        "id":  product_id,
         "title": product.title,
         "slug": product.slug,
         "category": product.category,
@@ -148,7 +386,8 @@ def create_new_product(product: schemas.ProductRequest):
         "unit_price": product.unit_price,
         "stock": product.stock,
         "score": product.score,
-        "released_at": datetime.now(),
+        "released_at": now,
+        "updated_at": now,
         "cover": product.cover,
         "images": [],
         "comments": [],
@@ -157,10 +396,13 @@ def create_new_product(product: schemas.ProductRequest):
         "offer": 0,
         "preview": True,
     }
-    cart_db = products_collection.insert_one(product_db)
-    print(
-        f"A New Product Was Created by ID ({cart_db.inserted_id}) <=> {last_id + 1} [{created_at}]"
-    )
+    try:
+        products_collection.insert_one(product_db)
+    except DuplicateKeyError:
+        raise ValueError(f"A Product with Slug ({product.slug}) Already Exists!")
+    # Counted Only Once the Product Exists
+    add_new_product_to_category(product_id, product.category)
+    log.info("Product Created", extra={"product_id": product_id})
 
     return product_db
 
@@ -169,7 +411,7 @@ def get_product(product_id: str):
     """
         Find A Product by ProductID
     """
-    return products_collection.find_one({"id": product_id}, {"_id": 0})
+    return catalog_products_collection.find_one({"id": product_id}, PRODUCT_PROJECTION)
 
 
 def update_product_items(cart_index: str, items: List[dict]):
@@ -204,18 +446,208 @@ def get_category_products(category_id: int, skip: int = 0, limit: int = 12) -> L
     """
     return [
         product
-        for product in products_collection.find({"category": category_id}, {"_id": 0}).sort([("id", -1)]).skip(skip).limit(limit)
+        for product in catalog_products_collection.find({"category": category_id}, PRODUCT_PROJECTION).sort([("id", -1)]).skip(skip).limit(limit)
     ]
 
 
+def import_products(rows: List[dict], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+        Create or Update Products Keyed by Slug, `batch_size` Rows per Round
+
+        Each round validates its rows, looks their slugs up with one query,
+        allocates ids for new slugs as one block, writes with one unordered
+        bulk_write and applies category membership changes in aggregate.
+        Returns a per-row report; a bad row never fails the others.
+    """
+    report = {"created": 0, "updated": 0, "failed": 0, "rows": []}
+    seen = set()
+    for start in range(0, len(rows), batch_size):
+        for result in import_product_batch(rows[start:start + batch_size], start, seen):
+            report[result["status"] if result["status"] != "error" else "failed"] += 1
+            report["rows"].append(result)
+    return report
+
+
+def import_product_batch(rows: List[dict], offset: int, seen: set) -> List[dict]:
+    results = []
+    valid = []
+    for index, row in enumerate(rows, start=offset):
+        if not isinstance(row, dict):
+            results.append({"row": index, "status": "error", "errors": ["Row Is Not A JSON Object!"]})
+            continue
+        try:
+            product = schemas.ProductRequest(**row)
+        except ValidationError as error:
+            results.append({
+                "row": index,
+                "slug": row.get("slug", ""),
+                "status": "error",
+                "errors": error.errors(),
+            })
+            continue
+        if product.slug in seen:
+            results.append({
+                "row": index,
+                "slug": product.slug,
+                "status": "error",
+                "errors": ["Duplicate Slug in This Import!"],
+            })
+            continue
+        seen.add(product.slug)
+        valid.append((index, product))
+
+    if not valid:
+        return results
+
+    existing = {
+        product["slug"]: product
+        for product in products_collection.find(
+            {"slug": {"$in": [product.slug for _, product in valid]}},
+            {"_id": 0, "slug": 1, "id": 1, "category": 1, "stock": 1}
+        )
+    }
+    held = held_quantities([product["id"] for product in existing.values()])
+    new_ids = iter(allocate_ids(
+        "products",
+        sum(product.slug not in existing for _, product in valid),
+        get_last_product_id
+    ))
+
+    now = datetime.now()
+    requests = []
+    planned = []
+    for index, product in valid:
+        current = existing.get(product.slug)
+        product_id = current["id"] if current else next(new_ids)
+        update = {
+            "$set": {**product.dict(exclude={"slug", "stock"}), "updated_at": now},
+            "$setOnInsert": {
+                "id": product_id,
+                "released_at": now,
+                "images": [],
+                "comments": [],
+                "views": 0,
+                "sales": 0,
+                "offer": 0,
+                "preview": True,
+            },
+        }
+        if current:
+            # Imported Stock Is On Hand, Units Held by Reservations Aren't Available;
+            # A Delta Keeps Reservations Made Meanwhile
+            available = product.stock - held.get(product_id, 0)
+            update["$inc"] = {"stock": available - current.get("stock", 0)}
+        else:
+            update["$setOnInsert"]["stock"] = product.stock
+        requests.append(UpdateOne({"slug": product.slug}, update, upsert=True))
+        planned.append({
+            "row": index,
+            "slug": product.slug,
+            "id": product_id,
+            "status": "updated" if current else "created",
+            "category": product.category,
+            "previous_category": current["category"] if current else None,
+        })
+
+    failed = {}
+    try:
+        products_collection.bulk_write(requests, ordered=False)
+    except BulkWriteError as error:
+        failed = {
+            write_error["index"]: write_error["errmsg"]
+            for write_error in error.details.get("writeErrors", [])
+        }
+
+    added, removed = {}, {}
+    for position, result in enumerate(planned):
+        category = result.pop("category")
+        previous_category = result.pop("previous_category")
+        if position in failed:
+            results.append({**result, "status": "error", "errors": [failed[position]]})
+            continue
+        results.append(result)
+        if category != previous_category:
+            added.setdefault(category, []).append(result["id"])
+            if previous_category is not None:
+                removed.setdefault(previous_category, []).append(result["id"])
+    update_category_members(added, removed)
+
+    return sorted(results, key=lambda result: result["row"])
+
+
+def export_products(fields: List[str], since: Optional[datetime] = None, batch_size: int = 500):
+    """
+        Stream Products from A Single Cursor (Released/Updated Since `since`)
+    """
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+
+    if since is None:
+        # Full Export, in ID Order along the ID Index
+        cursor = catalog_products_collection.find({}, projection).sort([("id", 1)])
+    else:
+        # Unsorted, So Both Date Indexes Can Serve the $or
+        cursor = catalog_products_collection.find(
+            {"$or": [{"released_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]},
+            projection
+        )
+
+    with cursor.batch_size(batch_size):
+        yield from cursor
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_chunks(products: Iterable[dict], batch_size: int = 500):
+    """
+        One JSON Object per Line, Yielded A Batch at A Time
+    """
+    lines = []
+    for product in products:
+        lines.append(json.dumps(product, ensure_ascii=False, default=export_value))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_chunks(products: Iterable[dict], fields: List[str], batch_size: int = 500):
+    """
+        CSV with A Header Row, Lists Encoded as JSON
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    for product in products:
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, list)
+            else export_value(value) if isinstance(value, datetime)
+            else value
+            for value in (product.get(field, "") for field in fields)
+        ])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
 # ----------- { CART Functionalities } -----------
 def save_invoice_image(image: UploadFile, image_key: str):
     """
         Upload Invoice Image
     """
     image_url = ""
-    bucket = client.Bucket(BUCKET_INVOICES)
     try:
+        bucket = get_storage().Bucket(BUCKET_INVOICES)
         bucket.upload_fileobj(
             image.file,
             image_key,
@@ -223,7 +655,7 @@ def save_invoice_image(image: UploadFile, image_key: str):
         )
         image_url = f"{STORAGE_URL}/{BUCKET_INVOICES}/{image_key}"
     except Exception:
-        pass
+        log.warning("Invoice Image Upload Failed", exc_info=True, extra={"image_key": image_key})
 
     return image_url
 
@@ -249,14 +681,16 @@ def carts(skip: int = 0, limit: int = 12) -> List[dict]:
     ]
 
 
-def create_new_cart(user_id: int = 0):
+def create_new_cart(user_id: int = 0, cart_index: str = ""):
     """
-        Create A New Cart
+        Create A New Cart (Or Return the Existing One for A Given Index)
     """
-    cart_index = random_cart_id()
-
-    while get_cart(cart_index):
-        cart_index = random_cart_id()
+    if cart_index:
+        cart = get_cart(cart_index)
+        if cart:
+            return cart
+    else:
+        cart_index = unused_cart_index()
 
     last_id = get_last_cart_id()
     created_at = datetime.now()
@@ -268,10 +702,18 @@ def create_new_cart(user_id: int = 0):
         "amounts":  0,
         "total":  0,
         "created_at": created_at,
+        # UTC, As TTL Indexes Compare against UTC
+        "last_modified": datetime.utcnow(),
     }
-    cart_db = carts_collection.insert_one(cart)
-    print(
-        f"A New Cart Was Created by ID ({cart_db.inserted_id}) -> {cart_index} <=> {last_id + 1} [{created_at}]"
+    try:
+        carts_collection.insert_one(cart)
+    except DuplicateKeyError:
+        # A Concurrent Request Created It First (Retried rotate_cart)
+        return get_cart(cart_index)
+    # Every Visitor Creates A Cart, Keep A Sample Only
+    log.info(
+        "Cart Created",
+        extra={"cart_id": last_id + 1, "cart_index": cart_index, "sample": True}
     )
     return get_cart(cart_index)
 
@@ -283,6 +725,16 @@ def get_cart(cart_index: str):
     return carts_collection.find_one({"cart_index": cart_index}, {"_id": 0})
 
 
+def unused_cart_index() -> str:
+    """
+        Generate A Cart Index Not Used by Any Cart
+    """
+    cart_index = random_cart_id()
+    while get_cart(cart_index):
+        cart_index = random_cart_id()
+    return cart_index
+
+
 def update_cart_items(cart_index: str, items: List[dict]):
     """
         Update Cart Values Like:
@@ -290,11 +742,7 @@ def update_cart_items(cart_index: str, items: List[dict]):
             Amounts
             Total
     """
-    amounts = 0
-    total = 0
-    for item in items:
-        amounts += item["quantity"]
-        total += item["unit_price"] * item["quantity"]
+    amounts, total = cart_totals(items)
 
     return carts_collection.find_one_and_update(
         {"cart_index": cart_index},
@@ -303,12 +751,569 @@ def update_cart_items(cart_index: str, items: List[dict]):
                 "items": items,
                 "amounts": amounts,
                 "total": total,
+                "last_modified": datetime.utcnow(),
             }
         },
+        {"_id": 0},
         upsert=False
     )
 
 
+def cart_totals(items: List[dict]):
+    """
+        Cart Amounts and Total
+    """
+    amounts = 0
+    total = 0
+    for item in items:
+        amounts += item["quantity"]
+        total += item["unit_price"] * item["quantity"]
+    return amounts, total
+
+
+def valid_cart_items(items: List[dict]) -> List[dict]:
+    """
+        Cart Lines with A Positive Product ID, Quantity and A Unit Price
+
+        Carts are stored as sent, so malformed lines are dropped here
+        rather than failing whatever reads them.
+    """
+    valid = []
+    for item in items:
+        try:
+            line = {
+                **item,
+                "id": int(item["id"]),
+                "quantity": int(item["quantity"]),
+                "unit_price": int(item["unit_price"]),
+            }
+        except (KeyError, TypeError, ValueError):
+            continue
+        if line["id"] > 0 and line["quantity"] > 0:
+            valid.append(line)
+    return valid
+
+
+def merge_cart_items(items: List[dict], other_items: List[dict]) -> List[dict]:
+    """
+        Combine Two Item Lists, Summing Quantities of the Same Product
+    """
+    merged = {}
+    for item in valid_cart_items(items) + valid_cart_items(other_items):
+        if item["id"] in merged:
+            merged[item["id"]]["quantity"] += item["quantity"]
+        else:
+            merged[item["id"]] = dict(item)
+    return list(merged.values())
+
+
+def assign_cart(user_id: int, cart_index: str):
+    """
+        Make A Cart the User's Current Cart
+    """
+    users_collection.update_one({"id": user_id}, {"$set": {"cart_index": cart_index}})
+    return carts_collection.find_one_and_update(
+        {"cart_index": cart_index},
+        {"$set": {"user_id": user_id, "status": "pending", "last_modified": datetime.utcnow()}},
+        {"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def merge_carts(user: dict, anonymous_cart_index: str = "", retries: int = 3):
+    """
+        Merge An Anonymous Cart into the User's Cart on Login
+
+        The anonymous cart is claimed atomically (status "merged"), so a
+        retried login merges it only once. The user's cart is then written
+        once, conditioned on its items being unchanged since they were read.
+    """
+    user_cart = get_cart(user.get("cart_index", "")) if user.get("cart_index") else None
+    if user_cart and user_cart.get("status") == "ordered":
+        user_cart = None
+
+    anonymous_cart = None
+    if anonymous_cart_index and (not user_cart or anonymous_cart_index != user_cart["cart_index"]):
+        anonymous_cart = carts_collection.find_one_and_update(
+            {
+                "cart_index": anonymous_cart_index,
+                "user_id": {"$in": [0, user["id"]]},
+                "status": {"$nin": ["merged", "ordered"]},
+            },
+            {"$set": {"status": "merged", "last_modified": datetime.utcnow()}},
+            {"_id": 0}
+        )
+
+    if not user_cart:
+        if anonymous_cart:
+            # Adopt the Anonymous Cart
+            return assign_cart(user["id"], anonymous_cart_index)
+        cart = create_new_cart(user["id"])
+        return assign_cart(user["id"], cart["cart_index"])
+
+    if not anonymous_cart or not valid_cart_items(anonymous_cart["items"]):
+        return user_cart
+
+    for _ in range(retries):
+        items = merge_cart_items(user_cart["items"], anonymous_cart["items"])
+        amounts, total = cart_totals(items)
+        changes = {
+            "items": items,
+            "amounts": amounts,
+            "total": total,
+            "last_modified": datetime.utcnow(),
+        }
+        cart = carts_collection.find_one_and_update(
+            {"cart_index": user_cart["cart_index"], "items": user_cart["items"]},
+            {"$set": changes},
+            {"_id": 0}
+        )
+        if cart:
+            carts_collection.update_one(
+                {"cart_index": anonymous_cart_index},
+                {"$set": {"merged_into": user_cart["cart_index"]}}
+            )
+            return {**cart, **changes}
+        # The User's Cart Changed Concurrently, Merge into Its New Items
+        user_cart = get_cart(user_cart["cart_index"])
+        if not user_cart or user_cart.get("status") == "ordered":
+            # ... or Is Gone (Archived, Deleted, Invoiced): Adopt the Anonymous Cart
+            return assign_cart(user["id"], anonymous_cart_index)
+
+    # Give the Anonymous Cart Back So A Later Login Can Merge It
+    carts_collection.update_one(
+        {"cart_index": anonymous_cart_index, "status": "merged"},
+        {"$set": {"status": "pending"}}
+    )
+    return user_cart
+
+
+def archive_abandoned_carts(days: int = CART_ARCHIVE_AFTER_DAYS, batch_size: int = CART_ARCHIVE_BATCH) -> int:
+    """
+        Move Untouched Non-Empty Anonymous Carts to the Cold carts_archive Collection
+
+        Empty anonymous carts are removed by the TTL index instead; legacy
+        carts without last_modified are judged by created_at. A cart is only
+        deleted if it's unchanged since it was read, otherwise its archived
+        copy is dropped and it stays live.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    query = {
+        "user_id": {"$in": [0, None]},
+        "$or": [
+            {"last_modified": {"$lt": cutoff}, "amounts": {"$gt": 0}},
+            {"last_modified": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ]
+    }
+
+    archived = 0
+    while True:
+        carts_batch = list(carts_collection.find(query).limit(batch_size))
+        if not carts_batch:
+            return archived
+
+        # Legacy Carts of Registered Users (Owner Never Recorded)
+        owners = claim_cart_owners([cart["cart_index"] for cart in carts_batch])
+        carts_batch = [cart for cart in carts_batch if cart["cart_index"] not in owners]
+        if not carts_batch:
+            continue
+
+        archived_at = datetime.utcnow()
+        for cart in carts_batch:
+            cart["archived_at"] = archived_at
+        try:
+            carts_archive_collection.insert_many(carts_batch, ordered=False)
+        except BulkWriteError as error:
+            # Already Archived by An Interrupted Run
+            if any(item["code"] != 11000 for item in error.details["writeErrors"]):
+                raise
+
+        result = carts_collection.bulk_write(
+            [
+                DeleteOne({
+                    "_id": cart["_id"],
+                    "user_id": {"$in": [0, None]},
+                    "last_modified": cart["last_modified"] if "last_modified" in cart else {"$exists": False},
+                })
+                for cart in carts_batch
+            ],
+            ordered=False
+        )
+        if result.deleted_count < len(carts_batch):
+            # Updated Since They Were Read
+            live = carts_collection.distinct("_id", {"_id": {"$in": [cart["_id"] for cart in carts_batch]}})
+            carts_archive_collection.delete_many({"_id": {"$in": live}})
+        archived += result.deleted_count
+
+
+def claim_cart_owners(cart_indexes: List[str]) -> set:
+    """
+        Record the Owner of Carts Referenced by A User; Returns Their Indexes
+    """
+    owners = list(users_collection.find(
+        {"cart_index": {"$in": cart_indexes}},
+        {"_id": 0, "id": 1, "cart_index": 1}
+    ))
+    record_cart_owners(owners)
+    return {owner["cart_index"] for owner in owners}
+
+
+def record_cart_owners(users: List[dict]):
+    if not users:
+        return
+    carts_collection.bulk_write(
+        [
+            UpdateOne(
+                {"cart_index": user["cart_index"], "user_id": {"$in": [0, None]}},
+                {"$set": {"user_id": user["id"]}}
+            )
+            for user in users
+        ],
+        ordered=False
+    )
+
+
+def migrate_cart_owners(batch_size: int = 1000):
+    """
+        Set user_id on Users' Current Carts Registered Before It Was Recorded
+
+        Keeps the empty anonymous carts TTL index off registered users' carts.
+    """
+    users = []
+    for user in users_collection.find({"cart_index": {"$nin": ["", None]}}, {"_id": 0, "id": 1, "cart_index": 1}):
+        users.append(user)
+        if len(users) >= batch_size:
+            record_cart_owners(users)
+            users = []
+    record_cart_owners(users)
+
+
+# ----------- { INVOICE Functionalities } -----------
+def get_invoice(idempotency_key: str, cart_index: str = ""):
+    """
+        Find An Invoice by Idempotency Key or Cart Index
+    """
+    return invoices_collection.find_one(
+        {"$or": [
+            {"idempotency_key": idempotency_key},
+            {"cart_index": cart_index or idempotency_key},
+        ]},
+        {"_id": 0}
+    )
+
+
+def create_invoice(request: schemas.InvoiceRequest, cart: dict, idempotency_key: str, reservation_id: str):
+    """
+        Persist An Invoice Built from the Stored Cart (One Insert)
+
+        Returns (invoice, created). A retry that lost the race against the
+        first request gets the already stored invoice and `created=False`.
+    """
+    address = request.dict(
+        include={
+            "first_name", "last_name", "mobile", "email", "province",
+            "city", "details", "zip_code", "invoice", "status",
+        }
+    )
+    invoice = schemas.Invoice(**{**cart, **address}).dict()
+    invoice.update({
+        "idempotency_key": idempotency_key,
+        "reservation_id": reservation_id,
+        "next_cart_index": unused_cart_index(),
+        "registered_at": datetime.now(),
+    })
+
+    try:
+        invoices_collection.insert_one(invoice)
+    except DuplicateKeyError:
+        return get_invoice(idempotency_key, request.cart_index), False
+
+    del invoice["_id"]
+    return invoice, True
+
+
+def rotate_cart(invoice: dict):
+    """
+        Close the Invoiced Cart and Move Its User to A Fresh One (Idempotent)
+    """
+    carts_collection.update_one(
+        {"cart_index": invoice["cart_index"]},
+        {"$set": {"status": "ordered"}}
+    )
+    cart = create_new_cart(invoice["user_id"], invoice["next_cart_index"])
+    if invoice["user_id"]:
+        users_collection.update_one(
+            {"id": invoice["user_id"]},
+            {
+                "$set": {"cart_index": invoice["next_cart_index"]},
+                "$addToSet": {"invoices": invoice["id"]},
+            }
+        )
+    return cart
+
+
+# ----------- { STOCK Functionalities } -----------
+def reservation_lines(items: List[dict]) -> dict:
+    """
+        Quantities per Product ID (Duplicate Cart Lines Are Summed)
+
+        Raises ValueError on a line without a product ID or with a
+        non-integer quantity, before any stock is touched.
+    """
+    lines = {}
+    for item in items:
+        try:
+            product_id = int(item["id"])
+            quantity = int(item.get("quantity", 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"Invalid Cart Line: {item!r}")
+        if quantity > 0:
+            lines[product_id] = lines.get(product_id, 0) + quantity
+    return lines
+
+
+def reservation_matches(reservation: dict, items: List[dict]) -> bool:
+    """
+        Whether A Reservation Holds Exactly the Cart's Current Lines
+    """
+    try:
+        lines = reservation_lines(items)
+    except ValueError:
+        return False
+    return lines == {item["id"]: item["quantity"] for item in reservation["items"]}
+
+
+def held_quantities(product_ids: List[int]) -> dict:
+    """
+        Units per Product ID Taken by Held or Claimed Reservations
+    """
+    if not product_ids:
+        return {}
+    return {
+        held["_id"]: held["quantity"]
+        for held in reservations_collection.aggregate([
+            {"$match": {"status": {"$in": ["held", "claimed"]}, "items.id": {"$in": product_ids}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.id": {"$in": product_ids}}},
+            {"$group": {"_id": "$items.id", "quantity": {"$sum": "$items.quantity"}}},
+        ])
+    }
+
+
+def reserve_stock(cart_index: str, items: List[dict], ttl: int = RESERVATION_TTL) -> dict:
+    """
+        Reserve Stock for All Cart Lines, or None of Them
+
+        Every line is a conditional `$inc` (stock >= quantity) in a single
+        bulk_write. Applied lines are tagged with the reservation ID, so when
+        a line fails only the tagged ones are rolled back.
+    """
+    lines = reservation_lines(items)
+    now = datetime.utcnow()
+    reservation = {
+        "reservation_id": str(ObjectId()),
+        "cart_index": cart_index,
+        "items": [
+            {"id": product_id, "quantity": quantity}
+            for product_id, quantity in lines.items()
+        ],
+        "status": "held",
+        "settled": False,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ttl),
+    }
+    if not lines:
+        reservation["status"] = "rejected"
+        reservation["unavailable"] = []
+        return reservation
+
+    # Recorded First, So An Interrupted Reservation Is Still Released on Expiry;
+    # It Replaces the Cart's Previous Hold (A Retried Reserve Holds Stock Once)
+    # (The Partial Unique Index Catches A Concurrent Reserve of the Same Cart)
+    for attempt in range(3):
+        for held in reservations_collection.find(
+            {"cart_index": cart_index, "status": "held"},
+            {"_id": 0, "reservation_id": 1}
+        ):
+            release_reservation(held["reservation_id"], status="replaced")
+        try:
+            reservations_collection.insert_one(reservation)
+            break
+        except DuplicateKeyError:
+            reservation.pop("_id", None)
+            if attempt == 2:
+                raise
+    del reservation["_id"]
+
+    reservation_id = reservation["reservation_id"]
+    # Stock Changes Bump updated_at, So Incremental Exports Pick Them Up
+    updated_at = datetime.now()
+    result = products_collection.bulk_write(
+        [
+            UpdateOne(
+                {
+                    "id": product_id,
+                    "stock": {"$gte": quantity},
+                    "pending_reservations": {"$ne": reservation_id},
+                },
+                {
+                    "$inc": {"stock": -quantity},
+                    "$push": {"pending_reservations": reservation_id},
+                    "$set": {"updated_at": updated_at},
+                }
+            )
+            for product_id, quantity in lines.items()
+        ],
+        ordered=True
+    )
+    if result.matched_count == len(lines):
+        return reservation
+
+    release_reservation(reservation_id, status="rejected")
+    reservation["status"] = "rejected"
+    stocks = {
+        product["id"]: product.get("stock", 0)
+        for product in products_collection.find(
+            {"id": {"$in": list(lines)}},
+            {"_id": 0, "id": 1, "stock": 1}
+        )
+    }
+    reservation["unavailable"] = [
+        product_id
+        for product_id, quantity in lines.items()
+        if stocks.get(product_id, 0) < quantity
+    ]
+    return reservation
+
+
+def get_reservation(reservation_id: str):
+    """
+        Find A Reservation by Reservation ID
+    """
+    return reservations_collection.find_one({"reservation_id": reservation_id}, {"_id": 0})
+
+
+def settle_reservation(reservation: dict, restock: bool):
+    """
+        Remove A Reservation's Tags from Products (Idempotent)
+
+        Committed reservations count as sales, released ones give the stock back.
+    """
+    reservation_id = reservation["reservation_id"]
+    updated_at = datetime.now()
+    requests = [
+        UpdateOne(
+            {"id": item["id"], "pending_reservations": reservation_id},
+            {
+                "$inc": {"stock": item["quantity"]} if restock else {"sales": item["quantity"]},
+                "$pull": {"pending_reservations": reservation_id},
+                "$set": {"updated_at": updated_at},
+            }
+        )
+        for item in reservation["items"]
+    ]
+    if requests:
+        products_collection.bulk_write(requests, ordered=False)
+
+    reservations_collection.update_one(
+        {"reservation_id": reservation_id},
+        {"$set": {"settled": True}}
+    )
+
+
+def claim_reservation(reservation_id: str, cart_index: str):
+    """
+        Take A Cart's Held (Unexpired) Reservation Out of Expiry for Invoicing
+
+        A claimed reservation keeps its stock until it's committed (the
+        invoice was stored) or released (it wasn't).
+    """
+    now = datetime.utcnow()
+    return reservations_collection.find_one_and_update(
+        {
+            "reservation_id": reservation_id,
+            "cart_index": cart_index,
+            "status": "held",
+            "expires_at": {"$gt": now},
+        },
+        {"$set": {"status": "claimed", "claimed_at": now}},
+        {"_id": 0}
+    )
+
+
+def commit_reservation(reservation_id: str):
+    """
+        Turn A Claimed Reservation into Sales
+    """
+    reservation = reservations_collection.find_one_and_update(
+        {"reservation_id": reservation_id, "status": "claimed"},
+        {"$set": {"status": "committed", "closed_at": datetime.utcnow()}},
+        {"_id": 0}
+    )
+    if reservation:
+        settle_reservation(reservation, restock=False)
+    return reservation
+
+
+def release_reservation(
+    reservation_id: str,
+    status: str = "released",
+    claimed: bool = False,
+    cart_index: Optional[str] = None
+):
+    """
+        Give the Stock of A Held (or Claimed) Reservation Back
+    """
+    query = {"reservation_id": reservation_id, "status": "claimed" if claimed else "held"}
+    if cart_index is not None:
+        query["cart_index"] = cart_index
+    reservation = reservations_collection.find_one_and_update(
+        query,
+        {"$set": {"status": status, "closed_at": datetime.utcnow()}},
+        {"_id": 0}
+    )
+    if reservation:
+        settle_reservation(reservation, restock=True)
+    return reservation
+
+
+def release_expired_reservations(limit: int = 1000) -> int:
+    """
+        Release Expired Reservations and Finish Interrupted Settlements
+    """
+    now = datetime.utcnow()
+    released = 0
+    for reservation in reservations_collection.find(
+        {"status": "held", "expires_at": {"$lte": now}},
+        {"_id": 0, "reservation_id": 1}
+    ).limit(limit):
+        if release_reservation(reservation["reservation_id"], status="expired"):
+            released += 1
+
+    # Claims Whose Request Died Before It Committed or Released Them
+    for reservation in reservations_collection.find(
+        {"status": "claimed", "claimed_at": {"$lte": now - timedelta(minutes=1)}},
+        {"_id": 0, "reservation_id": 1}
+    ).limit(limit):
+        reservation_id = reservation["reservation_id"]
+        if invoices_collection.find_one({"reservation_id": reservation_id}, {"_id": 1}):
+            commit_reservation(reservation_id)
+        elif release_reservation(reservation_id, status="expired", claimed=True):
+            released += 1
+
+    for reservation in reservations_collection.find(
+        {
+            "status": {"$in": ["committed", "released", "replaced", "rejected", "expired"]},
+            "settled": False,
+            "closed_at": {"$lte": now - timedelta(minutes=1)},
+        },
+        {"_id": 0}
+    ).limit(limit):
+        settle_reservation(reservation, restock=reservation["status"] != "committed")
+
+    return released
+
+
 # ----------- { MESSAGE Functionalities } -----------
 def get_last_message_id() -> int:
     """
@@ -331,14 +1336,11 @@ def messages(skip: int = 0, limit: int = 12) -> List[dict]:
     ]
 
 
-def post_message(request: schemas.MessageUser):
+def message_document(request: schemas.MessageUser, message_index: str) -> dict:
     """
-        Add A New Message
+        Message Document (Without Its ID)
     """
-    last_id = get_last_message_id()
-    message_index = random_cart_id()
-    message_object = {
-        "id":  last_id + 1,
+    return {
         "mesaage_index":  message_index,
         "user_id": request.user_id,
         "name": request.name,
@@ -346,15 +1348,123 @@ def post_message(request: schemas.MessageUser):
         "mobile": request.mobile,
         "message": request.message,
         "date": datetime.now(),
-        "responsed": False,
+        "responded": False,
+    }
+
+
+def post_message(request: schemas.MessageUser):
+    """
+        Add A New Message
+    """
+    message_id = allocate_ids("messages", 1, get_last_message_id)[0]
+    message_index = random_cart_id()
+    message_object = {
+        "id":  message_id,
+        **message_document(request, message_index),
     }
     message_object_db = messages_collection.insert_one(message_object)
-    print(
-        f"A New Message Has Received by ID ({message_object_db.inserted_id}) <=> {last_id + 1} [{datetime.now()}]"
-    )
+    log.info("Message Received", extra={"message_id": message_id})
     return message_object_db
 
 
+class MessageBuffer():
+    """
+        Buffered Message Intake
+
+        Submissions are acknowledged immediately and written by a background
+        thread with insert_many every `batch_size` messages or `flush_ms`
+        milliseconds. The queue is bounded: when it stays full for
+        `enqueue_timeout_ms` the submission is refused (back-pressure).
+        stop() drains and flushes everything still queued.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_ms: int = MESSAGE_FLUSH_MS,
+        queue_size: int = MESSAGE_QUEUE_SIZE,
+        enqueue_timeout_ms: int = MESSAGE_ENQUEUE_TIMEOUT_MS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self.queue = Queue(maxsize=queue_size)
+        self.stopping = Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = Thread(target=self.run, name="message-buffer", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout: float = 30):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, request: schemas.MessageUser) -> str:
+        """
+            Queue A Message, Returns Its Message Index ("" When Full)
+        """
+        message_index = random_cart_id()
+        try:
+            self.queue.put(message_document(request, message_index), timeout=self.enqueue_timeout)
+        except Full:
+            return ""
+        return message_index
+
+    def run(self):
+        while not (self.stopping.is_set() and self.queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except Empty:
+                    break
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch: List[dict], retries: int = 5):
+        for attempt in range(retries):
+            try:
+                # Allocated Once, Retried Messages Keep Their IDs
+                unnumbered = [message for message in batch if "id" not in message]
+                for message, message_id in zip(
+                    unnumbered,
+                    allocate_ids("messages", len(unnumbered), get_last_message_id)
+                ):
+                    message["id"] = message_id
+                messages_collection.insert_many(batch, ordered=False)
+                return
+            except BulkWriteError as error:
+                # Keep Only Messages That Weren't Written; Their _id Is Kept, So A
+                # Duplicate Key Means An Earlier Attempt Wrote It After All
+                failed = {
+                    item["index"] for item in error.details["writeErrors"]
+                    if item["code"] != 11000
+                }
+                batch = [message for index, message in enumerate(batch) if index in failed]
+                if not batch:
+                    return
+            except Exception as error:
+                log.warning(
+                    "Message Batch Flush Failed",
+                    extra={"attempt": attempt + 1, "retries": retries, "error": str(error)}
+                )
+            time.sleep(min(2 ** attempt * 0.1, 5))
+
+        log.error("Messages Dropped", extra={"count": len(batch), "retries": retries})
+
+
+message_buffer = MessageBuffer()
+
+
 def get_message(mesaage_index: str):
     """
         Find A Message by Message Index
@@ -368,9 +1478,103 @@ def response_message(mesaage_index: str, response: str):
     """
     return messages_collection.find_one_and_update(
         {"mesaage_index": mesaage_index},
-        {'$set': {'response': response, "responded": True}},
+        {'$set': {'response': response, "responded": True, "responded_at": datetime.now()}},
         {"_id": 0},
-        upsert=True
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def bulk_response_messages(responses: List[schemas.MessageResponse]) -> dict:
+    """
+        Response To Many Messages in One bulk_write
+    """
+    if not responses:
+        return {"matched": 0, "modified": 0}
+
+    responded_at = datetime.now()
+    result = messages_collection.bulk_write(
+        [
+            UpdateOne(
+                {"mesaage_index": item.mesaage_index},
+                {"$set": {"response": item.response, "responded": True, "responded_at": responded_at}}
+            )
+            for item in responses
+        ],
+        ordered=False
+    )
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+
+def encode_inbox_cursor(message: dict) -> str:
+    """
+        Keyset Cursor of A Message: responded.date(ms).id
+    """
+    date_ms = (message["date"] - EPOCH) // timedelta(milliseconds=1)
+    return f"{int(message['responded'])}.{date_ms}.{message['id']}"
+
+
+def decode_inbox_cursor(cursor: str):
+    """
+        (responded, date, id) of A Cursor; Raises ValueError If It's Malformed
+    """
+    responded, date_ms, message_id = cursor.split(".")
+    try:
+        date = EPOCH + timedelta(milliseconds=int(date_ms))
+    except OverflowError:
+        raise ValueError(f"Cursor Date Out of Range: {date_ms}")
+    return (
+        bool(int(responded)),
+        date,
+        int(message_id),
+    )
+
+
+def inbox(responded: Optional[bool] = None, after: str = "", limit: int = 20) -> dict:
+    """
+        Admin Inbox: Unresponded First, Newest First, Keyset Paginated
+
+        Served by the (responded, date, id) index; `after` is the `next`
+        cursor of the previous page.
+    """
+    query = {}
+    if responded is not None:
+        query["responded"] = responded
+
+    if after:
+        last_responded, last_date, last_id = decode_inbox_cursor(after)
+        conditions = [
+            {"responded": last_responded, "date": {"$lt": last_date}},
+            {"responded": last_responded, "date": last_date, "id": {"$lt": last_id}},
+        ]
+        if not last_responded and responded is None:
+            conditions.insert(0, {"responded": True})
+        query["$or"] = conditions
+
+    page = list(
+        messages_collection.find(query, {"_id": 0})
+        .sort([("responded", 1), ("date", -1), ("id", -1)])
+        .limit(limit)
+    )
+    return {
+        "messages": page,
+        "next": encode_inbox_cursor(page[-1]) if len(page) == limit else None,
+    }
+
+
+def migrate_messages():
+    """
+        Rename the Legacy `responsed` Field to `responded`
+
+        Legacy messages were written with responsed=False while responses set
+        responded=True, so a missing `responded` means unresponded.
+    """
+    messages_collection.update_many(
+        {"responded": {"$exists": False}},
+        {"$set": {"responded": False}}
+    )
+    messages_collection.update_many(
+        {"responsed": {"$exists": True}},
+        {"$unset": {"responsed": ""}}
     )
 
 
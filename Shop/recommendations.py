@@ -0,0 +1,215 @@
+"""
+    Co-Purchase Recommendations
+
+    Builds a sparse basket x product matrix from invoice and cart items,
+    derives the product co-occurrence matrix from it and stores the top-K
+    neighbours of every product (with a summary of each, so a product page
+    needs one indexed read). Run it from cron, or set RECOMMENDATIONS_INTERVAL
+    to rebuild inside the application:
+
+        python -m Shop.recommendations
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List
+import logging
+import time
+
+from decouple import config
+from pymongo import ReplaceOne
+
+from db_config import (
+    carts_collection,
+    invoices_collection,
+    products_collection,
+    related_products_collection
+)
+
+
+log = logging.getLogger(__name__)
+
+RECOMMENDATIONS_TOP_K = config("RECOMMENDATIONS_TOP_K", default=12, cast=int)
+# Carts Modified in the Last N Days Count As Baskets, at A Lower Weight than Invoices
+RECOMMENDATIONS_CART_DAYS = config("RECOMMENDATIONS_CART_DAYS", default=90, cast=int)
+RECOMMENDATIONS_CART_WEIGHT = config("RECOMMENDATIONS_CART_WEIGHT", default=0.5, cast=float)
+# Pairs Seen Together Less Often Are Ignored
+RECOMMENDATIONS_MIN_COUNT = config("RECOMMENDATIONS_MIN_COUNT", default=2, cast=int)
+# Seconds Between In-App Rebuilds (0 => Only from Cron)
+RECOMMENDATIONS_INTERVAL = config("RECOMMENDATIONS_INTERVAL", default=0, cast=int)
+
+SUMMARY_FIELDS = {"_id": 0, "id": 1, "title": 1, "slug": 1, "unit_price": 1, "offer": 1, "cover": 1}
+
+
+def ensure_indexes():
+    related_products_collection.create_index([("product_id", 1)], unique=True)
+
+
+def basket_ids(items: list) -> set:
+    """
+        Product IDs of A Basket's Lines (Lines Without A Positive Integer ID Are Skipped)
+    """
+    product_ids = set()
+    for item in items:
+        try:
+            product_id = int(item["id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if product_id > 0:
+            product_ids.add(product_id)
+    return product_ids
+
+
+def baskets() -> Iterable[tuple]:
+    """
+        (Weight, Product IDs) of Every Invoice and Recent Non-Empty Cart
+    """
+    for invoice in invoices_collection.find({}, {"_id": 0, "items.id": 1}):
+        yield 1.0, basket_ids(invoice.get("items", []))
+
+    since = datetime.utcnow() - timedelta(days=RECOMMENDATIONS_CART_DAYS)
+    for cart in carts_collection.find(
+        {"amounts": {"$gt": 0}, "last_modified": {"$gte": since}},
+        {"_id": 0, "items.id": 1}
+    ):
+        yield RECOMMENDATIONS_CART_WEIGHT, basket_ids(cart.get("items", []))
+
+
+def co_occurrence(basket_items: Iterable[tuple], min_count: int = RECOMMENDATIONS_MIN_COUNT):
+    """
+        Product IDs and Their Cosine-Normalized Co-Occurrence Matrix (CSR)
+    """
+    # SciPy Is Only Needed by This Job, Keep It Off the API's Import Path
+    import numpy as np
+    from scipy import sparse
+
+    columns = {}
+    rows, cols, weights = [], [], []
+    counted = []
+    basket = 0
+    for weight, product_ids in basket_items:
+        if len(product_ids) < 2:
+            continue
+        for product_id in product_ids:
+            rows.append(basket)
+            cols.append(columns.setdefault(product_id, len(columns)))
+            weights.append(weight)
+            counted.append(1)
+        basket += 1
+
+    product_ids = np.empty(len(columns), dtype=np.int64)
+    for product_id, column in columns.items():
+        product_ids[column] = product_id
+    if not basket:
+        return product_ids, sparse.csr_matrix((len(columns), len(columns)))
+
+    shape = (basket, len(columns))
+    matrix = sparse.csr_matrix((np.asarray(weights), (rows, cols)), shape=shape)
+    counts = sparse.csr_matrix((np.asarray(counted, dtype=np.float32), (rows, cols)), shape=shape)
+
+    scores = (matrix.T @ matrix).tocsr()
+    # Unweighted Pair Counts, to Drop Coincidental Pairs
+    pairs = (counts.T @ counts).tocsr()
+
+    # cosine(i, j) = C[i, j] / sqrt(C[i, i] * C[j, j])
+    norms = np.sqrt(scores.diagonal())
+    norms[norms == 0] = 1
+    inverse = sparse.diags(1 / norms)
+    scores = (inverse @ scores @ inverse).tocsr()
+
+    scores.setdiag(0)
+    scores = scores.multiply(pairs >= min_count).tocsr()
+    scores.eliminate_zeros()
+    return product_ids, scores
+
+
+def top_neighbours(product_ids, scores, top_k: int) -> dict:
+    """
+        {product_id: [(neighbour_id, score)]}, Best First
+    """
+    import numpy as np
+
+    neighbours = {}
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        if start == end:
+            continue
+        data = scores.data[start:end]
+        indices = scores.indices[start:end]
+        if len(data) > top_k:
+            best = np.argpartition(-data, top_k)[:top_k]
+            data, indices = data[best], indices[best]
+        order = np.argsort(-data, kind="stable")
+        neighbours[int(product_ids[row])] = [
+            (int(product_ids[indices[index]]), round(float(data[index]), 4))
+            for index in order
+        ]
+    return neighbours
+
+
+def summaries(product_ids: List[int], batch_size: int = 1000) -> dict:
+    found = {}
+    for start in range(0, len(product_ids), batch_size):
+        for product in products_collection.find(
+            {"id": {"$in": product_ids[start:start + batch_size]}},
+            SUMMARY_FIELDS
+        ):
+            found[product["id"]] = product
+    return found
+
+
+def build_related(top_k: int = RECOMMENDATIONS_TOP_K, batch_size: int = 1000) -> int:
+    """
+        Rebuild the Related Products Collection; Returns the Products Covered
+    """
+    started = time.perf_counter()
+    built_at = datetime.utcnow()
+    product_ids, scores = co_occurrence(baskets())
+    neighbours = top_neighbours(product_ids, scores, top_k)
+    products = summaries(sorted({
+        neighbour for related in neighbours.values() for neighbour, _ in related
+    }))
+
+    requests = []
+    for product_id, related in neighbours.items():
+        documents = [
+            {**products[neighbour], "score": score}
+            for neighbour, score in related
+            if neighbour in products
+        ]
+        requests.append(ReplaceOne(
+            {"product_id": product_id},
+            {"product_id": product_id, "related": documents, "built_at": built_at},
+            upsert=True
+        ))
+        if len(requests) >= batch_size:
+            related_products_collection.bulk_write(requests, ordered=False)
+            requests = []
+    if requests:
+        related_products_collection.bulk_write(requests, ordered=False)
+
+    # Products That Have No Neighbours Anymore
+    related_products_collection.delete_many({"built_at": {"$lt": built_at}})
+    log.info(
+        "Related Products Built",
+        extra={
+            "products": len(neighbours),
+            "pairs": int(scores.nnz),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+    )
+    return len(neighbours)
+
+
+def get_related(product_id: int, limit: int = RECOMMENDATIONS_TOP_K) -> List[dict]:
+    """
+        Stored Neighbours of A Product (One Indexed Read)
+    """
+    related = related_products_collection.find_one(
+        {"product_id": product_id},
+        {"_id": 0, "related": {"$slice": limit}}
+    )
+    return related["related"] if related else []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Related Products Built for {build_related()} Products")
@@ -1,12 +1,21 @@
-from typing import List
-
-from fastapi import APIRouter, HTTPException, File, UploadFile, Request, Security
+from datetime import datetime
+from typing import List, Optional
+import json
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, File, Header, Query, UploadFile, Request, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import ValidationError
 
-from . import crud, schemas
+from . import crud, recommendations, schemas
+from Analytics import crud as analytics
 import auth
 
 
+log = logging.getLogger(__name__)
+
 shopRouter = APIRouter(
     prefix="/shop",
     tags=["Shop"]
@@ -99,7 +108,10 @@ async def new_product(
         )
 
     if payload["user_type"] == "SA":
-        product_db = crud.create_new_product(product)
+        try:
+            product_db = crud.create_new_product(product)
+        except ValueError as error:
+            raise HTTPException(409, str(error))
         del product_db["_id"]
         return product_db
 
@@ -136,7 +148,7 @@ async def upload_product_image(
         image_url = crud.save_product_image(image, image_key)
         if not image_url:
             raise HTTPException(401, "Image Wasn't Uploaded!")
-        print("Image Has Uploaded Successfully!")
+        log.info("Product Image Uploaded", extra={"image_key": image_key})
         return {
             "image_url": image_url
         }
@@ -147,6 +159,90 @@ async def upload_product_image(
     )
 
 
+@shopRouter.post("/products/import")
+async def import_products(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Security(security)
+):
+    """
+        Bulk Create/Update Products Keyed by Slug
+
+        The body is NDJSON (Content-Type: application/x-ndjson) or a JSON
+        array of ProductRequest rows. Returns a report with one entry per row.
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    body = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # Reported As A Failed Row
+                rows.append(None)
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(400, "Body Is Not Valid JSON!")
+        if not isinstance(rows, list):
+            raise HTTPException(400, "Expected A JSON Array of Products!")
+
+    return await run_in_threadpool(crud.import_products, rows)
+
+
+@shopRouter.get("/products/export")
+async def export_products(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    fields: str = "",
+    since: Optional[datetime] = None,
+    batch_size: int = Query(500, gt=0, le=10000)
+):
+    """
+        Export the Catalog as NDJSON or CSV (Streamed from One Cursor)
+
+        `fields` is a comma-separated projection (default: every exportable
+        field); with `since`, only products released or updated since then.
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()] or crud.EXPORT_FIELDS
+    unknown = set(selected) - set(crud.EXPORT_FIELDS)
+    if unknown:
+        raise HTTPException(400, f"Unknown Fields: {', '.join(sorted(unknown))}")
+
+    # A Sync Generator, Iterated in the Threadpool by StreamingResponse
+    products = crud.export_products(selected, since, batch_size)
+    if format == "csv":
+        return StreamingResponse(
+            crud.csv_chunks(products, selected, batch_size),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="products.csv"'}
+        )
+    return StreamingResponse(
+        crud.ndjson_chunks(products, batch_size),
+        media_type="application/x-ndjson"
+    )
+
+
 @shopRouter.get("/products/by_id")
 async def get_product(product_id: int):
     """
@@ -155,9 +251,17 @@ async def get_product(product_id: int):
     return crud.get_product(product_id) or {}
 
 
+@shopRouter.get("/products/{product_id}/related")
+async def related_products(product_id: int, limit: int = Query(12, gt=0, le=50)):
+    """
+        Products Frequently Bought Together with A Product
+    """
+    return recommendations.get_related(product_id, limit)
+
+
 @shopRouter.get("/products/search")
-async def filter_products_by_category(category_id: int):
-    return crud.get_category_products(category_id)
+async def filter_products_by_category(category_id: int, skip: int = 0, limit: int = 12):
+    return crud.get_category_products(category_id, skip, limit)
 
 
 # ----------- { CART Endpoints } -----------
@@ -219,38 +323,236 @@ async def upload_invoice(image: UploadFile = File(...), image_key: str = "", is_
     """
     if not image_key:
         image_key = str(image.filename)
-    print(f"ImageKey => {image_key}")
 
     image_url = crud.save_invoice_image(image, image_key)
     if not image_url:
         raise HTTPException(401, "Image Wasn't Uploaded!")
-    print("Image Has Uploaded Successfully!")
+    log.info("Invoice Image Uploaded", extra={"image_key": image_key})
     return {
         "image_url": image_url
     }
 
 
+@shopRouter.post("/cart/reserve")
+def reserve_cart(cart_index: str):
+    """
+        Reserve Stock for A Cart's Items (Replacing Its Previous Reservation)
+    """
+    cart = crud.get_cart(cart_index)
+    if not cart:
+        raise HTTPException(404, f"Cart ({cart_index}) Was Not Found!")
+
+    try:
+        reservation = crud.reserve_stock(cart_index, cart["items"])
+    except ValueError as error:
+        raise HTTPException(422, str(error))
+    if reservation["status"] != "held":
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Not Enough Stock!",
+                "unavailable": reservation["unavailable"],
+            }
+        )
+    return reservation
+
+
+@shopRouter.post("/cart/reserve/release")
+def release_cart_reservation(reservation_id: str, cart_index: str):
+    """
+        Release A Cart's Stock Reservation
+    """
+    return crud.release_reservation(reservation_id, cart_index=cart_index) or {}
+
+
 @shopRouter.post("/cart/invoice/register")
-async def register(invoice: schemas.InvoiceRequest):
+def register(
+    invoice: schemas.InvoiceRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: str = Header("", max_length=128)
+):
     """
         Register Invoice
+
+        Retries with the same `Idempotency-Key` header (or for the same cart)
+        return the stored invoice instead of registering it twice.
     """
+    idempotency_key = idempotency_key or invoice.cart_index
+    invoice_db = crud.get_invoice(idempotency_key, invoice.cart_index)
+    if invoice_db:
+        return {
+            "invoice": invoice_db,
+            "cart": crud.rotate_cart(invoice_db),
+        }
+
+    cart = crud.get_cart(invoice.cart_index)
+    if not cart:
+        raise HTTPException(404, f"Cart ({invoice.cart_index}) Was Not Found!")
+
+    reservation_id = invoice.reservation_id
+    if not reservation_id:
+        try:
+            reservation = crud.reserve_stock(invoice.cart_index, cart["items"])
+        except ValueError as error:
+            raise HTTPException(422, str(error))
+        if reservation["status"] != "held":
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Not Enough Stock!",
+                    "unavailable": reservation["unavailable"],
+                }
+            )
+        reservation_id = reservation["reservation_id"]
+
+    # Claimed Before the Invoice Is Stored, So Its Stock Can't Expire Meanwhile
+    reservation = crud.claim_reservation(reservation_id, invoice.cart_index)
+    if not reservation:
+        raise HTTPException(410, "Stock Reservation Has Expired!")
+    # The Invoice Is Built from the Cart, So It Must Be What Was Reserved
+    if not crud.reservation_matches(reservation, cart["items"]):
+        crud.release_reservation(reservation_id, claimed=True)
+        raise HTTPException(409, "Cart Changed after Its Stock Was Reserved!")
+
     try:
-        print(invoice.dict())
-        return crud.create_new_cart()
-    except Exception as error:
-        print(error)
+        invoice_db, created = crud.create_invoice(
+            invoice,
+            cart,
+            idempotency_key,
+            reservation_id
+        )
+    except ValidationError as error:
+        crud.release_reservation(reservation_id, claimed=True)
+        raise HTTPException(422, error.errors())
+    except Exception:
+        crud.release_reservation(reservation_id, claimed=True)
+        raise
+
+    if created:
+        crud.commit_reservation(reservation_id)
+        log.info(
+            "Invoice Registered",
+            extra={"invoice_id": invoice_db["id"], "cart_index": invoice_db["cart_index"]}
+        )
+        # Sales Rollups Are Updated after the Response Is Sent
+        background_tasks.add_task(analytics.record_invoice, invoice_db)
+    else:
+        # A Concurrent Retry Registered It First
+        crud.release_reservation(reservation_id, claimed=True)
+
+    return {
+        "invoice": invoice_db,
+        "cart": crud.rotate_cart(invoice_db),
+    }
 
 
 # ----------- { MESSAGE Endpoints } -----------
 @shopRouter.post("/messages/new")
-async def send_message(message: schemas.MessageUser):
+def send_message(message: schemas.MessageUser):
     """
         POST A Message
     """
+    if crud.MESSAGE_INTAKE == "buffered":
+        message_index = crud.message_buffer.submit(message)
+        if not message_index:
+            raise HTTPException(
+                status_code=503,
+                detail="Too Many Messages, Try Again Later!",
+                headers={"Retry-After": "1"}
+            )
+        return message_index
+
     message_db = crud.post_message(message)
     try:
         del message_db["_id"]
         return message_db
     except:
         return str(message_db.inserted_id)
+
+
+@shopRouter.get("/messages")
+async def inbox(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    responded: Optional[bool] = None,
+    after: str = "",
+    limit: int = Query(20, gt=0, le=100)
+):
+    """
+        Admin Inbox (Unresponded First, Pass `next` As `after` for the Next Page)
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    try:
+        return crud.inbox(responded, after, limit)
+    except ValueError:
+        raise HTTPException(400, "Invalid Cursor!")
+
+
+@shopRouter.get("/messages/find")
+async def get_message(
+    mesaage_index: str,
+    credentials: HTTPAuthorizationCredentials = Security(security)
+):
+    """
+        Find A Message
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    return crud.get_message(mesaage_index) or {}
+
+
+@shopRouter.post("/messages/respond")
+async def respond_message(
+    message: schemas.MessageResponse,
+    credentials: HTTPAuthorizationCredentials = Security(security)
+):
+    """
+        Response To A Message
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    message_db = crud.response_message(message.mesaage_index, message.response)
+    if not message_db:
+        raise HTTPException(404, f"Message ({message.mesaage_index}) Was Not Found!")
+    return message_db
+
+
+@shopRouter.post("/messages/respond/bulk")
+async def respond_messages(
+    messages: List[schemas.MessageResponse],
+    credentials: HTTPAuthorizationCredentials = Security(security)
+):
+    """
+        Response To Many Messages at Once
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    return crud.bulk_response_messages(messages)
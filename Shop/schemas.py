@@ -5,9 +5,9 @@ from typing import List
 from pydantic import BaseModel, Field
 from decouple import config
 
-ARVAN_BASE_URL = config("ARVAN_BASE_URL")
-BUCKET_INVOICES = config("BUCKET_INVOICES")
-BUCKET_PRODUCTS = config("BUCKET_PRODUCTS")
+ARVAN_BASE_URL = config("ARVAN_BASE_URL", default="")
+BUCKET_INVOICES = config("BUCKET_INVOICES", default="")
+BUCKET_PRODUCTS = config("BUCKET_PRODUCTS", default="")
 
 
 class MessageUser(BaseModel):
@@ -70,6 +70,25 @@ class Message(BaseModel):
         }
 
 
+class MessageResponse(BaseModel):
+    """
+        Message Response Schema
+    """
+    mesaage_index: str = Field(..., min_length=8, max_length=8)
+    response: str = Field(..., max_length=1024)
+
+    class Config:
+        """
+            Configuration
+        """
+        schema_extra = {
+            "example": {
+                "mesaage_index": "random_key",
+                "response": "پاسخ پیام",
+            }
+        }
+
+
 class Comment(BaseModel):
     """
         Comment Schema
@@ -110,6 +129,7 @@ class Category(BaseModel):
     id: int = Field(..., gt=0)
     title: str = Field(..., max_length=128)
     products: List[int] = []
+    product_count: int = Field(0, ge=0)
 
     class Config:
         """
@@ -119,7 +139,8 @@ class Category(BaseModel):
             "example": {
                 "id": randint(1, 100),
                 "title": "عنوان دسته‌بندی",
-                "products": []
+                "products": [],
+                "product_count": 0
             }
         }
 
@@ -243,7 +264,7 @@ class Cart(BaseModel):
     total: int = Field(0, ge=0)
     created_at: datetime = datetime.now()
     status: str = "pending"
-    # last_modified: datetime = datetime.now()
+    last_modified: datetime = datetime.utcnow()
 
     class Config:
         """
@@ -258,7 +279,8 @@ class Cart(BaseModel):
                 "amounts": 0,
                 "total": 0,
                 "created_at": datetime.now(),
-                "status": "pending"
+                "status": "pending",
+                "last_modified": datetime.utcnow()
             }
         }
 
@@ -284,6 +306,7 @@ class InvoiceRequest(BaseModel):
     zip_code: str = Field(..., min_length=10, max_length=10)
     status: str = Field("pending", min_length=4, max_length=7)
     invoice: str = Field(..., max_length=256)
+    reservation_id: str = Field("", max_length=24)
 
     class Config:
         """
@@ -307,6 +330,7 @@ class InvoiceRequest(BaseModel):
                 "zip_code": "1234567890",
                 "status": "pending",
                 "invoice": "image_url",
+                "reservation_id": "",
             }
         }
 
@@ -0,0 +1,211 @@
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Iterable
+
+from decouple import config, Csv
+from fastapi import APIRouter, HTTPException, Security
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+import auth
+import metrics
+
+
+# <class>=<concurrent requests>:<queued requests>, per Worker
+ADMISSION_LIMITS = config(
+    "ADMISSION_LIMITS",
+    default="auth=8:16,upload=4:8,catalog=64:256,cart=32:64",
+    cast=Csv()
+)
+# Seconds A Request May Wait in Its Queue Before It's Shed
+ADMISSION_QUEUE_TIMEOUT = config("ADMISSION_QUEUE_TIMEOUT", default=5, cast=float)
+ADMISSION_RETRY_AFTER = config("ADMISSION_RETRY_AFTER", default=1, cast=int)
+
+admissionRouter = APIRouter(
+    prefix="/admin",
+    tags=["Admission"]
+)
+
+security = HTTPBearer()
+auth_handler = auth.Auth()
+
+
+def parse_limits(limits: Iterable[str]) -> Dict[str, tuple]:
+    """
+        {"auth": (8, 16)} from ["auth=8:16"]
+    """
+    parsed = {}
+    for limit in limits:
+        name, _, sizes = limit.partition("=")
+        concurrency, _, queue = sizes.partition(":")
+        parsed[name.strip()] = (int(concurrency), int(queue or 0))
+    return parsed
+
+
+class Gate():
+    """
+        A Concurrency Limit with A Bounded FIFO Queue (One Event Loop)
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, registry=metrics.registry):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.waiters = deque()
+        labels = (("class", name),)
+        # Gauge Cells Are Updated in Place, Like the HTTP Metrics
+        self.active = registry.gauge("admission_active_requests", labels)
+        self.queued = registry.gauge("admission_queued_requests", labels)
+        self.rejected = registry.counter("admission_rejected_total", labels)
+
+    async def acquire(self, timeout: float) -> bool:
+        """
+            Take A Slot, Waiting Up to `timeout` in the Queue; False If Shed
+        """
+        if self.active[0] < self.concurrency and not self.waiters:
+            self.active[0] += 1
+            return True
+        if len(self.waiters) >= self.queue_size:
+            self.rejected[0] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.queued[0] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Handed A Slot Just As the Timeout Fired
+                return True
+            self.waiters.remove(waiter)
+            self.rejected[0] += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self.waiters.remove(waiter)
+            raise
+        finally:
+            self.queued[0] -= 1
+
+    def release(self):
+        """
+            Hand the Slot to the Next Waiter, or Free It
+        """
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active[0] -= 1
+
+    def state(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active[0],
+            "queued": self.queued[0],
+            "rejected": self.rejected[0],
+        }
+
+
+gates: Dict[str, Gate] = {}
+
+
+class AdmissionMiddleware():
+    """
+        Per-Route-Class Concurrency Limits with Bounded Queues
+
+        Requests are classified by the longest matching path prefix in
+        `classes`. Each class admits ADMISSION_LIMITS concurrent requests and
+        queues a bounded number more; a request that finds the queue full, or
+        waits longer than ADMISSION_QUEUE_TIMEOUT, gets 503 with Retry-After,
+        so a burst of logins or uploads can't starve catalog reads. Paths in
+        no class are not limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        classes: Dict[str, Iterable[str]],
+        limits: Iterable[str] = ADMISSION_LIMITS,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = ADMISSION_RETRY_AFTER
+    ):
+        self.app = app
+        self.queue_timeout = queue_timeout
+        self.retry_after = str(retry_after)
+
+        sizes = parse_limits(limits)
+        for name in classes:
+            if name not in sizes:
+                raise ValueError(f"No ADMISSION_LIMITS Entry for Route Class {name!r}")
+            gates[name] = Gate(name, *sizes[name])
+        self.prefixes = sorted(
+            ((prefix, gates[name]) for name, prefixes in classes.items() for prefix in prefixes),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+
+    def classify(self, path: str):
+        for prefix, gate in self.prefixes:
+            if path.startswith(prefix):
+                return gate
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.classify(scope["path"])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire(self.queue_timeout):
+            await self.shed(gate, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def shed(self, gate: Gate, send):
+        body = json.dumps({"detail": "Server Is Busy, Try Again Later!"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", self.retry_after.encode()),
+                (b"x-admission-class", gate.name.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+@admissionRouter.get("/admission")
+async def admission(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """
+        Live Slots, Queue Depths and Shed Counts of This Worker
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    return {name: gate.state() for name, gate in gates.items()}
+
+
+metrics.registry.describe("admission_active_requests", "gauge", "Requests holding an admission slot, by route class.")
+metrics.registry.describe("admission_queued_requests", "gauge", "Requests waiting for an admission slot, by route class.")
+metrics.registry.describe("admission_rejected_total", "counter", "Requests shed with 503, by route class.")
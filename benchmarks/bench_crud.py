@@ -0,0 +1,251 @@
+"""
+    CRUD Hot-Path Benchmark
+
+    Times the crud functions the API calls on every request against an
+    in-memory MongoDB (mongomock) and a filesystem stand-in for the S3
+    bucket, so it runs offline. Pass --backend mongod to run against
+    MONGO_DB_URI instead. Results are printed as JSON; save a run and
+    compare later runs against it:
+
+        python -m benchmarks.bench_crud --output baseline.json
+        python -m benchmarks.bench_crud --compare baseline.json --fail-above 10
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("DB_NAME", "benchmark_crud")
+
+import auth                                 # noqa: E402
+import db_config                            # noqa: E402
+from Shop import crud, schemas              # noqa: E402
+from Authentication import crud as auth_crud, schemas as auth_schemas  # noqa: E402
+
+
+class FilesystemBucket():
+    """
+        The Part of boto3's Bucket the crud Module Uses, Backed by A Directory
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def upload_fileobj(self, fileobj, key: str, ExtraArgs: dict = None):
+        with open(os.path.join(self.root, key.replace("/", "_")), "wb") as target:
+            target.write(fileobj.read())
+
+
+class FilesystemStorage():
+    """
+        S3 Resource Stand-In (Installed As crud._storage)
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def Bucket(self, name: str) -> FilesystemBucket:
+        return FilesystemBucket(os.path.join(self.root, name or "bucket"))
+
+
+class Upload():
+    """
+        UploadFile Stand-In (Only .file Is Read)
+    """
+
+    def __init__(self, content: bytes):
+        self.file = io.BytesIO(content)
+
+
+def connect(backend: str):
+    if backend == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock Is Required for --backend mongomock (pip install mongomock)")
+        db_config.use_connection(mongomock.MongoClient())
+    else:
+        db_config.get_db().client.drop_database(db_config.DB_NAME)
+
+
+def seed(products: int, carts: int, rng: random.Random) -> dict:
+    """
+        Categories, Products and Carts to Read and Update
+    """
+    crud.ensure_indexes()
+    crud.ensure_unique_indexes()
+    crud.categories_collection.insert_many([
+        {"id": category_id, "title": f"category {category_id}", "products": [], "product_count": 0}
+        for category_id in range(1, 11)
+    ])
+    crud.products_collection.insert_many([
+        {
+            "id": product_id,
+            "title": f"product {product_id}",
+            "slug": f"product-{product_id}",
+            "category": rng.randint(1, 10),
+            "unit_price": rng.randint(1, 500) * 1000,
+            "stock": rng.randint(0, 100),
+            "sales": rng.randint(0, 1000),
+            "score": 5,
+            "cover": "",
+        }
+        for product_id in range(1, products + 1)
+    ])
+    cart_indexes = [crud.create_new_cart()["cart_index"] for _ in range(carts)]
+    return {"products": products, "cart_indexes": cart_indexes}
+
+
+def measure(name: str, func, number: int, warmup: int) -> dict:
+    """
+        Per-Call Latency of `func` (Called with the Iteration Number)
+    """
+    for index in range(warmup):
+        func(index)
+
+    samples = []
+    for index in range(number):
+        started = time.perf_counter_ns()
+        func(index)
+        samples.append(time.perf_counter_ns() - started)
+
+    samples.sort()
+    total_seconds = sum(samples) / 1e9
+    return {
+        "name": name,
+        "number": number,
+        "ops_per_second": round(number / total_seconds, 1),
+        "mean_us": round(statistics.mean(samples) / 1000, 2),
+        "median_us": round(statistics.median(samples) / 1000, 2),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1] / 1000, 2),
+        "min_us": round(samples[0] / 1000, 2),
+    }
+
+
+def cases(data: dict, rng: random.Random) -> list:
+    """
+        (Name, Function, Relative Cost) of Every Benchmarked Call
+
+        Calls with a high relative cost (bcrypt) run fewer iterations.
+    """
+    auth_handler = auth.Auth()
+    token = auth_handler.encode_token("1", "CL")
+    cart_indexes = data["cart_indexes"]
+    product_ids = list(range(1, data["products"] + 1))
+    image = os.urandom(64 * 1024)
+
+    def cart_items(index: int) -> list:
+        return [
+            {"id": product_id, "quantity": rng.randint(1, 3), "unit_price": 10000}
+            for product_id in rng.sample(product_ids, 1 + index % 5)
+        ]
+
+    return [
+        ("products", lambda index: crud.products(skip=(index % 10) * 12, limit=12), 1),
+        ("get_product", lambda index: crud.get_product(rng.choice(product_ids)), 1),
+        ("get_category_products", lambda index: crud.get_category_products(1 + index % 10), 1),
+        ("get_cart", lambda index: crud.get_cart(rng.choice(cart_indexes)), 1),
+        ("update_cart_items", lambda index: crud.update_cart_items(rng.choice(cart_indexes), cart_items(index)), 1),
+        ("create_new_cart", lambda index: crud.create_new_cart(), 1),
+        ("random_cart_id", lambda index: crud.random_cart_id(), 1),
+        ("save_product_image", lambda index: crud.save_product_image(Upload(image), f"bench-{index}.jpg"), 1),
+        ("auth_encode_token", lambda index: auth_handler.encode_token(str(index), "CL"), 1),
+        ("auth_decode_token", lambda index: auth_handler.decode_token(token), 1),
+        (
+            "register_user",
+            lambda index: auth_crud.register_user(
+                auth_schemas.UserAuth(mobile=f"0912{index:07d}", password="benchmark"),
+                rng.choice(cart_indexes)
+            ),
+            50
+        ),
+    ]
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """
+        Median Latency Change (%) per Benchmark Present in Both Runs
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    changes = []
+    for result in report["results"]:
+        if result["name"] not in previous:
+            continue
+        before = previous[result["name"]]["median_us"]
+        changes.append({
+            "name": result["name"],
+            "baseline_median_us": before,
+            "median_us": result["median_us"],
+            "change_percent": round((result["median_us"] - before) / before * 100, 1) if before else 0.0,
+        })
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1].strip())
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--carts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", help="Run Only the Named Benchmark(s)")
+    parser.add_argument("--output", help="Also Write the Report to This File")
+    parser.add_argument("--compare", help="Baseline Report to Compare Against")
+    parser.add_argument("--fail-above", type=float, help="Exit 1 If Any Median Regresses by More (%%)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    connect(args.backend)
+    crud._storage = FilesystemStorage(tempfile.mkdtemp(prefix="bench_crud_"))
+    data = seed(args.products, args.carts, rng)
+
+    results = []
+    for name, func, cost in cases(data, rng):
+        if args.only and name not in args.only:
+            continue
+        results.append(measure(
+            name,
+            func,
+            max(args.number // cost, 10),
+            max(args.warmup // cost, 1)
+        ))
+
+    report = {
+        "benchmark": "bench_crud",
+        "backend": args.backend,
+        "python": sys.version.split()[0],
+        "timestamp": int(time.time()),
+        "products": args.products,
+        "carts": args.carts,
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            report["comparison"] = compare(report, json.load(baseline_file))
+
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, ensure_ascii=False)
+
+    db_config.close_connection()
+    if args.fail_above is not None and any(
+        change["change_percent"] > args.fail_above
+        for change in report.get("comparison", [])
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+    Import-Time Benchmark
+
+    Measures how long a fresh interpreter takes to import the application
+    modules, i.e. what every worker, test run and script pays before doing
+    any work. Results are printed as JSON.
+
+        python -m benchmarks.import_time
+        python -m benchmarks.import_time --repeat 20 --module main
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+
+MODULES = ["db_config", "auth", "Shop.crud", "Authentication.crud", "main"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child_env() -> dict:
+    """
+        Environment for the Child Interpreter (Offline Defaults)
+    """
+    env = dict(os.environ)
+    env.setdefault("JWT_SECRET", "benchmark")
+    env.setdefault("JWT_ALGORITHM", "HS256")
+    return env
+
+
+def time_import(module: str, repeat: int) -> dict:
+    """
+        Wall Time of `python -c "import module"` Minus Interpreter Startup
+    """
+    def run(statement: str) -> float:
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", statement],
+            cwd=ROOT,
+            env=child_env(),
+            check=True,
+        )
+        return time.perf_counter() - started
+
+    baseline = [run("pass") for _ in range(repeat)]
+    samples = [run(f"import {module}") for _ in range(repeat)]
+    overhead = statistics.median(baseline)
+
+    return {
+        "module": module,
+        "repeat": repeat,
+        "median_ms": round((statistics.median(samples) - overhead) * 1000, 2),
+        "min_ms": round((min(samples) - overhead) * 1000, 2),
+        "max_ms": round((max(samples) - overhead) * 1000, 2),
+    }
+
+
+def top_imports(module: str, count: int) -> list:
+    """
+        Slowest Imported Packages According to `-X importtime`
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=child_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = [
+            part.strip() for part in line.split(":", 1)[1].split("|")
+        ]
+        if not self_us.isdigit():
+            continue
+        rows.append({
+            "package": name,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:count]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1].strip())
+    parser.add_argument("--module", action="append", dest="modules")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    modules = args.modules or MODULES
+    report = {
+        "benchmark": "import_time",
+        "python": sys.version.split()[0],
+        "results": [time_import(module, args.repeat) for module in modules],
+        "slowest_imports": top_imports(modules[-1], args.top),
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+    HTTP Load Test with Weighted Shopper Scenarios
+
+    Virtual users repeatedly pick a scenario (browse the catalog, view a
+    product, fill a cart, log in, check out) by weight and run it against
+    the real application, either in-process through ASGI (on mongomock,
+    with seeded data) or against a running server. Prints throughput and
+    p50/p95/p99 latency per route as JSON.
+
+        python -m benchmarks.loadtest --users 50 --duration 30
+        python -m benchmarks.loadtest --url http://127.0.0.1:3000 --users 200 --duration 60
+        python -m benchmarks.loadtest --weights browse=1,checkout=5
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("DB_NAME", "benchmark_loadtest")
+
+
+WEIGHTS = {
+    "browse": 50,
+    "view_product": 25,
+    "cart": 15,
+    "login": 7,
+    "checkout": 3,
+}
+PASSWORD = "loadtest"
+
+
+class Session():
+    """
+        An HTTP Client That Records Latency and Status per Route Template
+    """
+
+    def __init__(self, client: httpx.AsyncClient, samples: dict, errors: dict):
+        self.client = client
+        self.samples = samples
+        self.errors = errors
+
+    async def request(self, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.samples[route].append(time.perf_counter() - started)
+            self.errors[route]["transport"] += 1
+            return None
+        self.samples[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route][str(response.status_code)] += 1
+        return response
+
+
+# ----------- { Scenarios } -----------
+async def browse(session: Session, data: dict, rng: random.Random):
+    for page in range(rng.randint(1, 3)):
+        await session.request("GET /shop/products", "GET", "/shop/products", params={"skip": page * 12, "limit": 12})
+    category_id = rng.choice(data["category_ids"])
+    await session.request("GET /shop/category/{category_id}", "GET", f"/shop/category/{category_id}")
+    await session.request(
+        "GET /shop/products/search", "GET", "/shop/products/search",
+        params={"category_id": category_id, "limit": 12}
+    )
+
+
+async def view_product(session: Session, data: dict, rng: random.Random):
+    await session.request(
+        "GET /shop/products/by_id", "GET", "/shop/products/by_id",
+        params={"product_id": rng.choice(data["product_ids"])}
+    )
+
+
+async def fill_cart(session: Session, data: dict, rng: random.Random) -> str:
+    response = await session.request("GET /shop/carts/new", "GET", "/shop/carts/new")
+    if response is None or response.status_code != 200:
+        return ""
+    cart_index = response.json()["cart_index"]
+
+    items = []
+    for product_id in rng.sample(data["product_ids"], rng.randint(1, 4)):
+        # Shoppers Add A Product from Its Page, the Cart Keeps A Copy
+        response = await session.request(
+            "GET /shop/products/by_id", "GET", "/shop/products/by_id",
+            params={"product_id": product_id}
+        )
+        if response is None or response.status_code != 200 or not response.json():
+            continue
+        items.append({**response.json(), "quantity": rng.randint(1, 2)})
+        await session.request(
+            "POST /shop/carts/update", "POST", "/shop/carts/update",
+            params={"cart_index": cart_index}, json=items
+        )
+    return cart_index
+
+
+async def cart(session: Session, data: dict, rng: random.Random):
+    await fill_cart(session, data, rng)
+
+
+async def login(session: Session, data: dict, rng: random.Random):
+    if not data["mobiles"]:
+        return
+    await session.request(
+        "POST /user/auth/login", "POST", "/user/auth/login",
+        json={"mobile": rng.choice(data["mobiles"]), "password": PASSWORD}
+    )
+
+
+async def checkout(session: Session, data: dict, rng: random.Random):
+    cart_index = await fill_cart(session, data, rng)
+    if not cart_index:
+        return
+    await session.request(
+        "POST /shop/cart/invoice/register", "POST", "/shop/cart/invoice/register",
+        json={
+            "cart_index": cart_index,
+            "first_name": "بار",
+            "last_name": "آزمون",
+            "mobile": "09120000000",
+            "province": "تهران",
+            "city": "تهران",
+            "details": "load test",
+            "zip_code": "1234567890",
+            "invoice": "",
+        }
+    )
+
+
+SCENARIOS = {
+    "browse": browse,
+    "view_product": view_product,
+    "cart": cart,
+    "login": login,
+    "checkout": checkout,
+}
+
+
+# ----------- { Setup } -----------
+def seed_in_process(products: int, categories: int, users: int, rng: random.Random) -> dict:
+    """
+        mongomock Database with A Catalog and Registered Users
+    """
+    import mongomock
+    import db_config
+    from Shop import crud
+    from Authentication import crud as auth_crud, schemas as auth_schemas
+
+    db_config.use_connection(mongomock.MongoClient())
+    crud.ensure_indexes()
+    crud.ensure_unique_indexes()
+    crud.categories_collection.insert_many([
+        {"id": category_id, "title": f"category {category_id}", "products": [], "product_count": 0}
+        for category_id in range(1, categories + 1)
+    ])
+    crud.products_collection.insert_many([
+        {
+            "id": product_id,
+            "title": f"product {product_id}",
+            "slug": f"product-{product_id}",
+            "category": rng.randint(1, categories),
+            "unit_price": 10000,
+            "stock": 1_000_000,
+            "sales": 0,
+            "score": 5,
+            "cover": "",
+        }
+        for product_id in range(1, products + 1)
+    ])
+    mobiles = [f"0912{index:07d}" for index in range(users)]
+    for mobile in mobiles:
+        auth_crud.register_user(
+            auth_schemas.UserAuth(mobile=mobile, password=PASSWORD),
+            crud.create_new_cart()["cart_index"]
+        )
+    return {
+        "product_ids": list(range(1, products + 1)),
+        "category_ids": list(range(1, categories + 1)),
+        "mobiles": mobiles,
+    }
+
+
+async def discover(client: httpx.AsyncClient, mobiles: list) -> dict:
+    """
+        Product and Category IDs of A Running Server
+    """
+    products = (await client.get("/shop/products", params={"limit": 100})).json()
+    categories = (await client.get("/shop/category", params={"limit": 100})).json()
+    return {
+        "product_ids": [product["id"] for product in products] or [1],
+        "category_ids": [category["id"] for category in categories] or [1],
+        "mobiles": mobiles,
+    }
+
+
+# ----------- { Runner } -----------
+async def virtual_user(session: Session, data: dict, weights: dict, deadline: float, think_time: float, seed: int, runs: dict):
+    rng = random.Random(seed)
+    names = list(weights)
+    cumulative = list(weights.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=cumulative)[0]
+        await SCENARIOS[name](session, data, rng)
+        runs[name] += 1
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+def percentile(samples: list, percent: float) -> float:
+    index = max(int(round(percent / 100 * len(samples))) - 1, 0)
+    return samples[min(index, len(samples) - 1)]
+
+
+def summarize(samples: dict, errors: dict, elapsed: float) -> list:
+    routes = []
+    for route, latencies in sorted(samples.items()):
+        latencies.sort()
+        routes.append({
+            "route": route,
+            "requests": len(latencies),
+            "errors": dict(errors[route]),
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        })
+    return routes
+
+
+def parse_weights(value: str) -> dict:
+    weights = dict(WEIGHTS)
+    for part in filter(None, value.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown Scenario: {name}")
+        weights[name] = float(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        import main
+        data = seed_in_process(args.products, args.categories, args.accounts, rng)
+        transport = httpx.ASGITransport(app=main.app)
+        base_url = "http://loadtest"
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.url:
+            data = await discover(client, args.mobile or [])
+
+        samples = defaultdict(list)
+        errors = defaultdict(lambda: defaultdict(int))
+        runs = defaultdict(int)
+        session = Session(client, samples, errors)
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(session, data, args.weights, deadline, args.think_time, args.seed + user, runs)
+            for user in range(args.users)
+        ])
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(latencies) for latencies in samples.values())
+    return {
+        "benchmark": "loadtest",
+        "target": args.url or "in-process",
+        "users": args.users,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "errors": sum(sum(counts.values()) for counts in errors.values()),
+        "scenarios": dict(runs),
+        "routes": summarize(samples, errors, elapsed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1].strip())
+    parser.add_argument("--url", help="Base URL of A Running Server (Default: In-Process ASGI)")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent Virtual Users")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds")
+    parser.add_argument("--think-time", type=float, default=0, help="Mean Pause between Scenarios (Seconds)")
+    parser.add_argument("--weights", type=parse_weights, default=dict(WEIGHTS), help="e.g. browse=10,checkout=2")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--products", type=int, default=500, help="In-Process Catalog Size")
+    parser.add_argument("--categories", type=int, default=10, help="In-Process Category Count")
+    parser.add_argument("--accounts", type=int, default=5, help="In-Process Registered Users")
+    parser.add_argument("--mobile", action="append", help="Registered Mobile of A Running Server (Password: loadtest)")
+    parser.add_argument("--output", help="Also Write the Report to This File")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+    Synthetic Data Generator
+
+    Streams categories, products, users, carts, messages and invoices shaped
+    like the schemas in Shop/schemas.py and Authentication/schemas.py into the
+    collections of db_config with batched insert_many. Output is
+    deterministic for a given --seed and --until: every product is generated
+    from its own id, so carts and invoices can copy product fields without
+    keeping the catalog in memory.
+
+    - Titles, descriptions and addresses are Persian
+    - Category sizes are skewed (Zipf over categories)
+    - Product popularity (sales, cart items) is Zipfian
+
+        MONGO_DB_URI=mongodb://localhost:27017 DB_NAME=shop_bench python -m benchmarks.seed --drop
+        python -m benchmarks.seed --products 1000000 --users 100000 --carts 300000 --drop
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import random
+import argparse
+from math import gcd
+from itertools import accumulate
+from datetime import datetime, timedelta, timezone
+from string import ascii_lowercase, ascii_uppercase, digits
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("DB_NAME", "benchmark_seed")
+os.environ.setdefault("MONGO_DB_URI", "mongodb://localhost:27017")
+
+import bcrypt                               # noqa: E402
+
+import db_config                            # noqa: E402
+from Shop import crud                       # noqa: E402
+
+
+ALPHABET = ascii_lowercase + ascii_uppercase + digits
+# Password of Every Seeded User (One bcrypt Hash Is Shared, Hashing Is Slow)
+PASSWORD = "seed-password"
+
+NOUNS = [
+    "گوشی", "لپ‌تاپ", "هدفون", "کتاب", "کفش", "پیراهن", "ساعت", "کیف", "دوربین",
+    "تبلت", "یخچال", "جاروبرقی", "میز", "صندلی", "فرش", "لامپ", "عطر", "کرم",
+    "شلوار", "کاپشن", "اسپیکر", "مانیتور", "کیبورد", "ماوس", "قابلمه", "بخاری",
+]
+ADJECTIVES = [
+    "هوشمند", "چرمی", "بی‌سیم", "ورزشی", "کلاسیک", "مدرن", "سبک", "حرفه‌ای",
+    "اقتصادی", "ضدآب", "دست‌ساز", "مردانه", "زنانه", "بچگانه", "قابل‌حمل",
+]
+BRANDS = [
+    "سامسونگ", "شیائومی", "ایران‌خودرو", "پارس", "نیک", "آریا", "ستاره",
+    "البرز", "زاگرس", "سپید", "مهر", "کیان", "هیرکان",
+]
+CATEGORY_NAMES = [
+    "موبایل", "کامپیوتر", "لوازم خانگی", "پوشاک", "کتاب و لوازم التحریر",
+    "آرایشی و بهداشتی", "ورزش و سفر", "اسباب بازی", "ابزار", "خودرو",
+]
+PHRASES = [
+    "کیفیت ساخت بسیار خوب", "ارسال سریع", "مناسب استفاده روزانه",
+    "گارانتی اصالت کالا", "طراحی زیبا", "قیمت مناسب", "دوام بالا",
+]
+FIRST_NAMES = ["علی", "زهرا", "محمد", "فاطمه", "رضا", "مریم", "حسین", "سارا", "امیر", "نرگس"]
+LAST_NAMES = ["محمدی", "حسینی", "احمدی", "رضایی", "کریمی", "موسوی", "جعفری", "اکبری"]
+PROVINCES = {
+    "تهران": ["تهران", "شهریار", "ورامین"],
+    "اصفهان": ["اصفهان", "کاشان"],
+    "فارس": ["شیراز", "مرودشت"],
+    "خراسان رضوی": ["مشهد", "نیشابور"],
+    "آذربایجان شرقی": ["تبریز", "مراغه"],
+}
+MESSAGES = [
+    "سفارش من هنوز ارسال نشده است", "امکان مرجوع کردن کالا وجود دارد؟",
+    "موجودی این محصول کی تکمیل می‌شود؟", "فاکتور رسمی صادر می‌کنید؟",
+    "کد تخفیف من اعمال نمی‌شود", "از خرید خود راضی هستم",
+]
+
+
+def zipf_cumulative(count: int, exponent: float) -> list:
+    """
+        Cumulative Zipf Weights of Ranks 1..count
+    """
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def code(index: int, offset: int, length: int = 8) -> str:
+    """
+        Unique Fixed-Length Code of An Index (A Bijection of the Code Space)
+    """
+    space = len(ALPHABET) ** length
+    # 1_000_003 Is Prime, So Scaling Is A Permutation of the Code Space
+    value = (index * 1_000_003 + offset) % space
+    characters = []
+    for _ in range(length):
+        value, remainder = divmod(value, len(ALPHABET))
+        characters.append(ALPHABET[remainder])
+    return "".join(characters)
+
+
+class Catalog():
+    """
+        Products as A Pure Function of (Seed, ID)
+    """
+
+    def __init__(self, seed: int, products: int, categories: int, skew: float, until: datetime):
+        self.seed = seed
+        self.products = products
+        self.categories = categories
+        self.until = until
+        self.category_weights = zipf_cumulative(categories, skew)
+        # Popularity Rank -> Product ID through A Fixed Permutation, So
+        # Popular Products Are Spread across the ID Range
+        self.stride = next(
+            stride for stride in range(products // 2 + 1, products * 2 + 2)
+            if gcd(stride, products) == 1
+        )
+
+    def product_at_rank(self, rank: int) -> int:
+        return (rank * self.stride + self.seed) % self.products + 1
+
+    def product(self, product_id: int) -> dict:
+        rng = random.Random(self.seed * 10_000_019 + product_id)
+        noun = rng.choice(NOUNS)
+        title = f"{noun} {rng.choice(ADJECTIVES)} {rng.choice(BRANDS)} مدل {rng.randint(100, 9999)}"
+        category = bisect.bisect(
+            self.category_weights,
+            rng.random() * self.category_weights[-1]
+        ) + 1
+        return {
+            "id": product_id,
+            "title": title,
+            "slug": f"{title.replace(' ', '-')}-{product_id}",
+            "category": category,
+            "description": "، ".join(rng.sample(PHRASES, 3)),
+            "unit_price": rng.randint(10, 5000) * 1000,
+            "stock": rng.choice([0, rng.randint(1, 20), rng.randint(20, 500)]),
+            "score": round(rng.uniform(2.5, 5), 1),
+            "released_at": self.until - timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60)),
+            "cover": f"products/{product_id}.jpg",
+            "images": [f"products/{product_id}-{image}.jpg" for image in range(rng.randint(0, 4))],
+            "comments": [],
+            "views": 0,
+            "sales": 0,
+            "offer": rng.choice([0, 0, 0, 5, 10, 20]),
+            "preview": True,
+        }
+
+    def item(self, product_id: int, quantity: int) -> dict:
+        """
+            Cart Line (schemas.ProductItem Fields of the Product)
+        """
+        product = self.product(product_id)
+        return {
+            "id": product_id,
+            "title": product["title"],
+            "unit_price": product["unit_price"],
+            "quantity": quantity,
+            "cover": product["cover"],
+            "stock": product["stock"],
+        }
+
+
+# ----------- { Generators } -----------
+def generate_products(catalog: Catalog, counts: list, members: list, sales_exponent: float):
+    # Rank of Every Product under the Permutation, for Its Sales Figure
+    top_sales = 50_000
+    ranks = {catalog.product_at_rank(rank): rank for rank in range(min(catalog.products, 100_000))}
+    for product_id in range(1, catalog.products + 1):
+        product = catalog.product(product_id)
+        rank = ranks.get(product_id)
+        if rank is not None:
+            product["sales"] = int(top_sales / (rank + 1) ** sales_exponent)
+            product["views"] = product["sales"] * 20
+        counts[product["category"] - 1] += 1
+        if members is not None:
+            members[product["category"] - 1].append(product_id)
+        yield product
+
+
+def generate_categories(counts: list, members: list):
+    for category_id, count in enumerate(counts, start=1):
+        name = CATEGORY_NAMES[(category_id - 1) % len(CATEGORY_NAMES)]
+        yield {
+            "id": category_id,
+            "title": f"{name} {category_id}",
+            "products": members[category_id - 1] if members else [],
+            "product_count": count,
+        }
+
+
+def generate_users(users: int, rng: random.Random):
+    security = bcrypt.hashpw((PASSWORD + "hashing").encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    for user_id in range(1, users + 1):
+        yield {
+            "id": user_id,
+            "mobile": f"09{100_000_000 + user_id:09d}",
+            "email": "",
+            "security": security,
+            "user_type": "CL",
+            "cart_index": code(user_id, 17),
+            "address": [],
+            "favorites": [],
+            "comments": [],
+            "invoices": [],
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "score": 0,
+            "credit": 0,
+        }
+
+
+def cart_items(catalog: Catalog, popularity: list, rng: random.Random, max_items: int) -> list:
+    count = rng.randint(1, max_items)
+    ranks = rng.choices(range(len(popularity)), cum_weights=popularity, k=count)
+    items = {}
+    for rank in ranks:
+        product_id = catalog.product_at_rank(rank)
+        items[product_id] = items.get(product_id, 0) + 1
+    return [catalog.item(product_id, quantity) for product_id, quantity in items.items()]
+
+
+def generate_carts(carts: int, users: int, catalog: Catalog, popularity: list, until: datetime, rng: random.Random):
+    for cart_id in range(1, carts + 1):
+        # The First `users` Carts Belong to the Seeded Users
+        user_id = cart_id if cart_id <= users else 0
+        empty = rng.random() < 0.3
+        items = [] if empty else cart_items(catalog, popularity, rng, 6)
+        amounts, total = crud.cart_totals(items)
+        created_at = until - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+        yield {
+            "id": cart_id,
+            "cart_index": code(cart_id, 17),
+            "user_id": user_id,
+            "items": items,
+            "amounts": amounts,
+            "total": total,
+            "created_at": created_at,
+            "status": "pending",
+            "last_modified": created_at + timedelta(minutes=rng.randint(0, 600)),
+        }
+
+
+def generate_messages(messages: int, users: int, until: datetime, rng: random.Random):
+    for message_id in range(1, messages + 1):
+        user_id = rng.randint(0, users)
+        responded = rng.random() < 0.6
+        yield {
+            "id": message_id,
+            "mesaage_index": code(message_id, 29),
+            "user_id": user_id,
+            "name": rng.choice(FIRST_NAMES),
+            "email": "",
+            "mobile": f"09{100_000_000 + user_id:09d}" if user_id else "09000000000",
+            "message": rng.choice(MESSAGES),
+            "date": until - timedelta(minutes=rng.randint(0, 180 * 24 * 60)),
+            "response": "پیگیری شد" if responded else "",
+            "responded": responded,
+        }
+
+
+def generate_invoices(invoices: int, users: int, catalog: Catalog, popularity: list, until: datetime, rng: random.Random):
+    for invoice_id in range(1, invoices + 1):
+        items = cart_items(catalog, popularity, rng, 4)
+        amounts, total = crud.cart_totals(items)
+        province = rng.choice(list(PROVINCES))
+        created_at = until - timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        # Invoices Use Cart Indexes of Their Own (cart_index Is Unique per Invoice)
+        cart_index = code(invoice_id, 41)
+        yield {
+            "id": invoice_id,
+            "cart_index": cart_index,
+            "user_id": rng.randint(0, users),
+            "items": items,
+            "amounts": amounts,
+            "total": total,
+            "created_at": created_at,
+            "status": rng.choice(["pending", "paid", "sent"]),
+            "last_modified": created_at,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "mobile": f"09{rng.randint(100_000_000, 999_999_999)}",
+            "email": "",
+            "province": province,
+            "city": rng.choice(PROVINCES[province]),
+            "details": f"خیابان {rng.choice(BRANDS)}، پلاک {rng.randint(1, 200)}",
+            "zip_code": f"{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+            "invoice": f"invoices/{cart_index}.jpg",
+            "idempotency_key": cart_index,
+            "reservation_id": "",
+            "next_cart_index": code(invoice_id, 53),
+            "registered_at": created_at,
+        }
+
+
+def stream(collection, documents, batch_size: int) -> dict:
+    """
+        insert_many in Batches (Unordered), Never Holding More than One Batch
+    """
+    started = time.perf_counter()
+    inserted = 0
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "documents": inserted,
+        "seconds": round(elapsed, 2),
+        "documents_per_second": round(inserted / elapsed, 1) if elapsed else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1].strip())
+    parser.add_argument("--backend", choices=["mongod", "mongomock"], default="mongod")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--until", default=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+                        help="Newest Generated Date (YYYY-MM-DD), Dates Go Back from It")
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--carts", type=int, default=30_000)
+    parser.add_argument("--messages", type=int, default=5_000)
+    parser.add_argument("--invoices", type=int, default=5_000)
+    parser.add_argument("--category-skew", type=float, default=1.0, help="Zipf Exponent of Category Sizes")
+    parser.add_argument("--popularity-skew", type=float, default=1.1, help="Zipf Exponent of Product Popularity")
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--drop", action="store_true", help="Drop the Seeded Collections First")
+    args = parser.parse_args(argv)
+
+    if args.backend == "mongomock":
+        import mongomock
+        db_config.use_connection(mongomock.MongoClient())
+
+    until = datetime.strptime(args.until, "%Y-%m-%d")
+    rng = random.Random(args.seed)
+    catalog = Catalog(args.seed, args.products, args.categories, args.category_skew, until)
+    # Cart Lines Draw from the 100K Most Popular Products (The Tail Is ~Never Picked)
+    popularity = zipf_cumulative(min(args.products, 100_000), args.popularity_skew)
+
+    collections = {
+        "products": crud.products_collection,
+        "categories": crud.categories_collection,
+        "users": db_config.users_collection,
+        "carts": crud.carts_collection,
+        "messages": crud.messages_collection,
+        "invoices": crud.invoices_collection,
+    }
+    if args.drop:
+        for collection in collections.values():
+            collection.drop()
+
+    counts = [0] * args.categories
+    # Product IDs per Category, Only Kept When Categories Embed Them
+    members = [[] for _ in range(args.categories)] if crud.CATEGORY_MEMBERSHIP == "embedded" else None
+    report = {
+        "benchmark": "seed",
+        "seed": args.seed,
+        "until": args.until,
+        "collections": {},
+    }
+    report["collections"]["products"] = stream(
+        collections["products"],
+        generate_products(catalog, counts, members, args.popularity_skew),
+        args.batch_size
+    )
+    # Product IDs Were Assigned Here, the Counter Restarts from the Highest
+    db_config.counters_collection.delete_one({"_id": "products"})
+    report["collections"]["categories"] = stream(
+        collections["categories"],
+        generate_categories(counts, members),
+        args.batch_size
+    )
+    report["collections"]["users"] = stream(
+        collections["users"],
+        generate_users(args.users, rng),
+        args.batch_size
+    )
+    report["collections"]["carts"] = stream(
+        collections["carts"],
+        generate_carts(max(args.carts, args.users), args.users, catalog, popularity, until, rng),
+        args.batch_size
+    )
+    report["collections"]["messages"] = stream(
+        collections["messages"],
+        generate_messages(args.messages, args.users, until, rng),
+        args.batch_size
+    )
+    db_config.counters_collection.delete_one({"_id": "messages"})
+    report["collections"]["invoices"] = stream(
+        collections["invoices"],
+        generate_invoices(args.invoices, args.users, catalog, popularity, until, rng),
+        args.batch_size
+    )
+
+    # Indexes Are Built Once over the Loaded Data
+    started = time.perf_counter()
+    crud.ensure_indexes()
+    crud.ensure_unique_indexes()
+    report["index_seconds"] = round(time.perf_counter() - started, 2)
+
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    db_config.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+    Stock Reservation Concurrency Check
+
+    Fires thousands of concurrent checkouts at a handful of scarce products
+    and verifies nothing is oversold: every product's final stock is
+    >= 0 and initial stock == final stock + units sold.
+
+        MONGO_DB_URI=mongodb://localhost:27017 python -m benchmarks.stock_reservation
+        python -m benchmarks.stock_reservation --checkouts 5000 --threads 64
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("JWT_SECRET", "benchmark")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("DB_NAME", "benchmark_reservations")
+os.environ.setdefault("MONGO_DB_URI", "mongodb://localhost:27017")
+
+import db_config                            # noqa: E402
+from Shop import crud                       # noqa: E402
+
+
+def seed(products: int, stock: int):
+    """
+        Fresh Products with Scarce Stock
+    """
+    crud.products_collection.delete_many({})
+    crud.reservations_collection.delete_many({})
+    crud.ensure_indexes()
+    crud.ensure_unique_indexes()
+    crud.products_collection.insert_many([
+        {"id": product_id, "title": f"product {product_id}", "stock": stock, "sales": 0}
+        for product_id in range(1, products + 1)
+    ])
+
+
+def checkout(products: int, max_quantity: int, commit_ratio: float, rng_seed: int) -> dict:
+    """
+        One Shopper: Reserve A Random Cart, Then Commit or Abandon It
+    """
+    rng = random.Random(rng_seed)
+    items = [
+        {"id": product_id, "quantity": rng.randint(1, max_quantity)}
+        for product_id in rng.sample(range(1, products + 1), rng.randint(1, products))
+    ]
+    reservation = crud.reserve_stock(f"bench-{rng_seed}", items)
+    if reservation["status"] != "held":
+        return {"status": "rejected", "units": 0}
+
+    if rng.random() < commit_ratio:
+        crud.claim_reservation(reservation["reservation_id"], reservation["cart_index"])
+        crud.commit_reservation(reservation["reservation_id"])
+        return {"status": "committed", "units": sum(item["quantity"] for item in items)}
+
+    crud.release_reservation(reservation["reservation_id"])
+    return {"status": "released", "units": 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stock Reservation Concurrency Check")
+    parser.add_argument("--checkouts", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    parser.add_argument("--commit-ratio", type=float, default=0.8)
+    args = parser.parse_args(argv)
+
+    seed(args.products, args.stock)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(
+            lambda index: checkout(args.products, args.max_quantity, args.commit_ratio, index),
+            range(args.checkouts)
+        ))
+    elapsed = time.perf_counter() - started
+
+    products = list(crud.products_collection.find({}, {"_id": 0}))
+    oversold = [
+        product["id"]
+        for product in products
+        if product["stock"] < 0 or product["stock"] + product["sales"] != args.stock
+    ]
+    pending = sum(len(product.get("pending_reservations", [])) for product in products)
+
+    report = {
+        "benchmark": "stock_reservation",
+        "checkouts": args.checkouts,
+        "threads": args.threads,
+        "seconds": round(elapsed, 3),
+        "checkouts_per_second": round(args.checkouts / elapsed, 1),
+        "committed": sum(result["status"] == "committed" for result in results),
+        "released": sum(result["status"] == "released" for result in results),
+        "rejected": sum(result["status"] == "rejected" for result in results),
+        "units_sold": sum(product["sales"] for product in products),
+        "pending_tags": pending,
+        "oversold_products": oversold,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    db_config.close_connection()
+    if oversold or pending:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import gzip                                 # Used for Gzip Content-Encoding
+import hashlib                              # Used to Key Compressed Variants
+from collections import OrderedDict         # Used as A Bounded LRU Cache
+from typing import Iterable, Optional
+
+from decouple import config
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli                           # Optional, Gzip Is Used Without It
+except ImportError:
+    brotli = None
+
+
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config("COMPRESSION_BROTLI_QUALITY", default=5, cast=int)
+COMPRESSION_CACHE_SIZE = config("COMPRESSION_CACHE_SIZE", default=256, cast=int)
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+        Parse Accept-Encoding Header (Ignoring Encodings with q=0)
+    """
+    encodings = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.add(name.strip())
+    return encodings
+
+
+class CompressionMiddleware():
+    """
+        Gzip/Brotli Response Compression
+
+        Only paths starting with one of `paths` are compressed (per-route opt-in).
+        Responses of `cacheable_paths` are kept in an LRU cache keyed by the
+        digest of the uncompressed body, so a popular catalog page is compressed
+        once and then served from memory.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Iterable[str] = (),
+        cacheable_paths: Iterable[str] = (),
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        cache_size: int = COMPRESSION_CACHE_SIZE,
+    ):
+        self.app = app
+        self.paths = tuple(paths)
+        self.cacheable_paths = tuple(cacheable_paths)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = (
+            scope["method"] == "GET"
+            and scope["path"].startswith(self.cacheable_paths)
+        )
+        responder = CompressionResponder(self, send, encoding, cacheable)
+        await self.app(scope, receive, responder.send)
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """
+            Choose The Best Encoding Supported by Both Sides
+        """
+        encodings = accepted_encodings(accept_encoding)
+        if brotli is not None and "br" in encodings:
+            return "br"
+        if "gzip" in encodings:
+            return "gzip"
+        return None
+
+    def compress(self, body: bytes, encoding: str, cacheable: bool) -> bytes:
+        """
+            Compress A Body (From Cache for Cacheable Routes)
+        """
+        if not cacheable or self.cache_size <= 0:
+            return self._compress(body, encoding)
+
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self.cache.get(key)
+        if compressed is not None:
+            self.cache.move_to_end(key)
+            return compressed
+
+        compressed = self._compress(body, encoding)
+        self.cache[key] = compressed
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return compressed
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+
+class CompressionResponder():
+    """
+        Buffer A Single-Chunk Response and Compress It
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: str, cacheable: bool):
+        self.middleware = middleware
+        self.downstream = send
+        self.encoding = encoding
+        self.cacheable = cacheable
+        self.start_message = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=self.start_message["headers"])
+
+        # Streaming Responses (Exports, Files) and Small Bodies Go Out As-Is
+        if (
+            message.get("more_body", False)
+            or len(body) < self.middleware.minimum_size
+            or "content-encoding" in headers
+        ):
+            self.passthrough = True
+            await self.downstream(self.start_message)
+            await self.downstream(message)
+            return
+
+        cacheable = self.cacheable and self.start_message["status"] == 200
+        compressed = self.middleware.compress(body, self.encoding, cacheable)
+
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+
+        await self.downstream(self.start_message)
+        await self.downstream({
+            "type": "http.response.body",
+            "body": compressed,
+        })
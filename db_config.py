@@ -1,34 +1,332 @@
-from pymongo import MongoClient
-from decouple import config
+import sys
+import logging
+from threading import Lock
 
-# Database Connection Information
-MONGO_DB_USERNAME = config("MONGO_DB_USERNAME")
-MONGO_DB_PASSWORD = config("MONGO_DB_PASSWORD")
-MONGO_DB_HOSTNAME = config("MONGO_DB_HOSTNAME")
-DB_NAME = ""
-if config("DB_NAME"):
-    DB_NAME = config("DB_NAME")
+from pymongo import MongoClient, monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+from decouple import config, Csv
 
-# Create Connection MongoDB URI
-connection_string = f"{MONGO_DB_USERNAME}:{MONGO_DB_PASSWORD}@{MONGO_DB_HOSTNAME}/{DB_NAME}"
-MONGO_DB_URI = f"mongodb+srv://{connection_string}?retryWrites=true&w=majority"
+import metrics
 
-# Connect to the MongoDB Cluster
-connection = MongoClient(MONGO_DB_URI)
 
-# Select A Database
-db = connection[DB_NAME]
+DB_NAME = config("DB_NAME", default="")
+# Full URI Override (e.g. A Local mongod), Otherwise Built from Credentials
+MONGO_DB_URI = config("MONGO_DB_URI", default="")
+
+# Connection Pool and Timeouts (Timeouts: 0 => Driver Default)
+MONGO_MAX_POOL_SIZE = config("MONGO_MAX_POOL_SIZE", default=100, cast=int)
+MONGO_MIN_POOL_SIZE = config("MONGO_MIN_POOL_SIZE", default=0, cast=int)
+MONGO_MAX_IDLE_TIME_MS = config("MONGO_MAX_IDLE_TIME_MS", default=0, cast=int)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = config("MONGO_WAIT_QUEUE_TIMEOUT_MS", default=0, cast=int)
+MONGO_CONNECT_TIMEOUT_MS = config("MONGO_CONNECT_TIMEOUT_MS", default=0, cast=int)
+MONGO_SOCKET_TIMEOUT_MS = config("MONGO_SOCKET_TIMEOUT_MS", default=0, cast=int)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = config("MONGO_SERVER_SELECTION_TIMEOUT_MS", default=0, cast=int)
+# Wire Compression, in Order of Preference: zstd, snappy, zlib
+# (zstd Needs `zstandard`, snappy Needs `python-snappy`)
+MONGO_COMPRESSORS = config("MONGO_COMPRESSORS", default="", cast=Csv())
+
+# Read Preference of Catalog Reads (Products, Categories)
+# primary | primaryPreferred | secondary | secondaryPreferred | nearest
+MONGO_CATALOG_READ_PREFERENCE = config("MONGO_CATALOG_READ_PREFERENCE", default="primary")
+# -1 => No Staleness Limit, Otherwise >= 90 Seconds
+MONGO_CATALOG_MAX_STALENESS = config("MONGO_CATALOG_MAX_STALENESS", default=-1, cast=int)
+
+# Command Monitoring: Latency Histograms per Collection/Command, and
+# Commands Slower than MONGO_SLOW_COMMAND_MS Are Logged with Their Caller
+MONGO_COMMAND_MONITORING = config("MONGO_COMMAND_MONITORING", default=True, cast=bool)
+MONGO_SLOW_COMMAND_MS = config("MONGO_SLOW_COMMAND_MS", default=100, cast=int)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+log = logging.getLogger(__name__)
+
+_connection = None
+_connection_lock = Lock()
+# Bumped Whenever the Client Is Replaced, Invalidates Cached Collections
+_generation = 0
+
+
+def get_mongo_uri() -> str:
+    """
+        Create Connection MongoDB URI
+    """
+    if MONGO_DB_URI:
+        return MONGO_DB_URI
+
+    username = config("MONGO_DB_USERNAME")
+    password = config("MONGO_DB_PASSWORD")
+    hostname = config("MONGO_DB_HOSTNAME")
+
+    connection_string = f"{username}:{password}@{hostname}/{DB_NAME}"
+    return f"mongodb+srv://{connection_string}?retryWrites=true&w=majority"
+
+
+def get_connection() -> MongoClient:
+    """
+        Connect to the MongoDB Cluster (On First Use)
+    """
+    global _connection
+    if _connection is None:
+        with _connection_lock:
+            if _connection is None:
+                _connection = MongoClient(get_mongo_uri(), **client_options())
+    return _connection
+
+
+def client_options() -> dict:
+    """
+        Pool, Timeout and Compression Options of the MongoClient
+    """
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+    }
+    optional = {
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    options.update({key: value for key, value in optional.items() if value})
+    if MONGO_COMPRESSORS:
+        options["compressors"] = ",".join(MONGO_COMPRESSORS)
+    if MONGO_COMMAND_MONITORING:
+        options["event_listeners"] = [command_monitor]
+    return options
+
+
+def filter_shape(query):
+    """
+        A Filter with Its Values Replaced (Keys and Operators Kept)
+    """
+    if isinstance(query, dict):
+        return {key: filter_shape(value) for key, value in query.items()}
+    if isinstance(query, (list, tuple)) and query and isinstance(query[0], dict):
+        return [filter_shape(value) for value in query]
+    return "?"
+
+
+def command_filter(command_name: str, command: dict):
+    """
+        The Filter Part of A Command Document (None If It Has No Filter)
+    """
+    if "filter" in command:
+        return command["filter"]
+    if "query" in command:
+        return command["query"]
+    for statements in ("updates", "deletes"):
+        if command.get(statements):
+            return command[statements][0].get("q")
+    if command_name == "aggregate":
+        return [
+            stage if "$match" in stage else {name: "..." for name in stage}
+            for stage in command.get("pipeline", [])
+        ]
+    return None
+
+
+def calling_function() -> str:
+    """
+        The Innermost Frame Outside the Driver (e.g. "Shop.crud.get_cart")
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module != __name__ and module.split(".")[0] not in ("pymongo", "bson", "threading"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return ""
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+        Per-Collection/Per-Command Latency Metrics and A Slow-Command Log
+
+        Events are published on the thread that runs the command, so the
+        calling crud function is still on the stack when a slow command is
+        reported; the stack is only walked for slow commands.
+    """
+
+    def __init__(self, slow_ms: int = MONGO_SLOW_COMMAND_MS):
+        self.slow_ms = slow_ms
+        self.pending = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+        self.pending[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def succeeded(self, event):
+        self.record(event, failed=False)
+
+    def failed(self, event):
+        self.record(event, failed=True)
+
+    def record(self, event, failed: bool):
+        collection, command = self.pending.pop(
+            (event.connection_id, event.request_id),
+            ("", None)
+        )
+        labels = (("collection", collection), ("command", event.command_name))
+        duration_ms = event.duration_micros / 1000
+
+        metrics.registry.observe("mongodb_command_duration_seconds", labels, duration_ms / 1000)
+        if failed:
+            metrics.registry.inc("mongodb_command_failures_total", labels)
+        if duration_ms < self.slow_ms:
+            return
+
+        metrics.registry.inc("mongodb_slow_commands_total", labels)
+        log.warning(
+            "Slow MongoDB Command",
+            extra={
+                "collection": collection,
+                "command": event.command_name,
+                "duration_ms": round(duration_ms, 2),
+                "caller": calling_function(),
+                "filter": filter_shape(command_filter(event.command_name, command or {})),
+                "failed": failed,
+            }
+        )
+
+
+command_monitor = CommandMonitor()
+
+metrics.registry.describe("mongodb_command_duration_seconds", "histogram", "MongoDB command latency by collection and command.")
+metrics.registry.describe("mongodb_command_failures_total", "counter", "MongoDB commands that failed.")
+metrics.registry.describe("mongodb_slow_commands_total", "counter", "MongoDB commands slower than MONGO_SLOW_COMMAND_MS.")
+
+
+def read_preference(mode: str, max_staleness: int = -1):
+    """
+        Build A Read Preference from Its Name
+    """
+    try:
+        preference = READ_PREFERENCES[mode.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown Read Preference: {mode}")
+
+    if preference is Primary:
+        return Primary()
+    return preference(max_staleness=max_staleness)
+
+
+def use_connection(connection: MongoClient):
+    """
+        Replace the MongoDB Client (Benchmarks, Scripts)
+    """
+    global _connection, _generation
+    with _connection_lock:
+        _connection = connection
+        _generation += 1
+
+
+def close_connection():
+    """
+        Close the MongoDB Client If It Was Opened
+    """
+    global _connection, _generation
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+            _generation += 1
+
+
+def get_db():
+    """
+        Select A Database
+    """
+    return get_connection()[DB_NAME]
+
+
+class LazyCollection():
+    """
+        Collection Handle Resolved on First Use
+
+        Importing this module never touches the network; the client is
+        created by the first query (or by the application startup hook).
+    """
+
+    def __init__(self, name: str, read_preference=None):
+        self.name = name
+        self.read_preference = read_preference
+        self._collection = None
+        self._generation = -1
+
+    @property
+    def collection(self):
+        if self._collection is None or self._generation != _generation:
+            self._collection = get_db().get_collection(
+                self.name,
+                read_preference=self.read_preference
+            )
+            self._generation = _generation
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self.collection, attr)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self.name!r})"
+
 
 # Collections
-users_collection = db.users
-products_collection = db.new_products
-categories_collection = db.categories
-carts_collection = db.carts
-address_collection = db.address
-comments_collection = db.comments
-invoices_collection = db.invoices
-messages_collection = db.messages
+users_collection = LazyCollection("users")
+products_collection = LazyCollection("new_products")
+categories_collection = LazyCollection("categories")
+carts_collection = LazyCollection("carts")
+carts_archive_collection = LazyCollection("carts_archive")
+address_collection = LazyCollection("address")
+comments_collection = LazyCollection("comments")
+invoices_collection = LazyCollection("invoices")
+messages_collection = LazyCollection("messages")
+reservations_collection = LazyCollection("reservations")
+idempotency_collection = LazyCollection("idempotency_keys")
+# Login Rate Limit Buckets ({"_id": <key>, "tokens", "updated_at"})
+rate_limits_collection = LazyCollection("rate_limits")
+# Daily Sales Rollups (Analytics)
+sales_rollups_collection = LazyCollection("sales_rollups")
+# Top-K Co-Purchased Products per Product
+related_products_collection = LazyCollection("related_products")
+# Scheduled Job Leases ({"_id": <job name>, "owner", "expires_at"})
+job_leases_collection = LazyCollection("job_leases")
+# One-Time Migrations ({"_id": <name>, "state": "running" | "done", "owner", "started_at"})
+migrations_collection = LazyCollection("migrations")
+# Sequence Counters ({"_id": <name>, "value": <last allocated id>})
+counters_collection = LazyCollection("counters")
+
+# Catalog Reads, Routed by MONGO_CATALOG_READ_PREFERENCE
+# (Writes and ID Lookups Stay on products_collection/categories_collection)
+CATALOG_READ_PREFERENCE = read_preference(
+    MONGO_CATALOG_READ_PREFERENCE,
+    MONGO_CATALOG_MAX_STALENESS
+)
+catalog_products_collection = LazyCollection(
+    "new_products",
+    read_preference=CATALOG_READ_PREFERENCE
+)
+catalog_categories_collection = LazyCollection(
+    "categories",
+    read_preference=CATALOG_READ_PREFERENCE
+)
 
 
 if __name__ == "__main__":
-    print(db.list_collection_names())
+    print(get_db().list_collection_names())
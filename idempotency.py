@@ -0,0 +1,291 @@
+import json
+import time
+import hashlib
+from threading import Lock
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from decouple import config
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from db_config import idempotency_collection
+
+
+IDEMPOTENCY_BACKEND = config("IDEMPOTENCY_BACKEND", default="memory")
+# Seconds A Stored Response Is Replayed
+IDEMPOTENCY_TTL = config("IDEMPOTENCY_TTL", default=86400, cast=int)
+# Seconds Before A Pending Key (e.g. Its Worker Died) Can Be Taken Over
+IDEMPOTENCY_LOCK_TIMEOUT = config("IDEMPOTENCY_LOCK_TIMEOUT", default=30, cast=int)
+IDEMPOTENCY_MAX_ENTRIES = config("IDEMPOTENCY_MAX_ENTRIES", default=10000, cast=int)
+# Client Errors A Retry of the Same Request Would Get Again (Others, Like
+# 401, 404, 409, 410 or 429, Can Change, So They're Not Replayed)
+STORED_CLIENT_ERRORS = frozenset({400, 403, 405, 406, 411, 413, 414, 415, 422})
+
+
+class MemoryIdempotencyStore():
+    """
+        Per-Process LRU Store (Single Worker or Sticky Clients Only)
+    """
+    blocking = False
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.records = OrderedDict()
+        self.lock = Lock()
+
+    def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+            Mark A Key Pending, or Return Its Existing Record
+        """
+        now = time.time()
+        with self.lock:
+            record = self.records.get(key)
+            if record and record["expires_at"] > now and not (
+                record["state"] == "pending"
+                and record["created_at"] + IDEMPOTENCY_LOCK_TIMEOUT < now
+            ):
+                self.records.move_to_end(key)
+                return record
+
+            self.records[key] = {
+                "fingerprint": fingerprint,
+                "state": "pending",
+                "created_at": now,
+                "expires_at": now + self.ttl,
+            }
+            self.records.move_to_end(key)
+            while len(self.records) > self.max_entries:
+                self.records.popitem(last=False)
+        return None
+
+    def save(self, key: str, response: dict):
+        with self.lock:
+            record = self.records.get(key)
+            if record:
+                record.update(response, state="done")
+
+    def discard(self, key: str):
+        with self.lock:
+            record = self.records.get(key)
+            if record and record["state"] == "pending":
+                del self.records[key]
+
+
+class MongoIdempotencyStore():
+    """
+        Store Shared by All Workers (TTL Index on created_at)
+    """
+    blocking = True
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL):
+        self.ttl = ttl
+
+    def ensure_indexes(self):
+        idempotency_collection.create_index(
+            [("created_at", 1)],
+            expireAfterSeconds=self.ttl
+        )
+
+    def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        now = datetime.utcnow()
+        try:
+            idempotency_collection.insert_one({
+                "_id": key,
+                "fingerprint": fingerprint,
+                "state": "pending",
+                "created_at": now,
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Take Over A Stale Pending Key
+        stale = idempotency_collection.find_one_and_update(
+            {
+                "_id": key,
+                "state": "pending",
+                "created_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)},
+            },
+            {"$set": {"fingerprint": fingerprint, "created_at": now}}
+        )
+        if stale:
+            return None
+        return idempotency_collection.find_one({"_id": key})
+
+    def save(self, key: str, response: dict):
+        idempotency_collection.update_one(
+            {"_id": key},
+            {"$set": {**response, "state": "done"}}
+        )
+
+    def discard(self, key: str):
+        idempotency_collection.delete_one({"_id": key, "state": "pending"})
+
+
+def get_store():
+    """
+        Idempotency Store Selected by IDEMPOTENCY_BACKEND
+    """
+    if IDEMPOTENCY_BACKEND == "mongo":
+        return MongoIdempotencyStore()
+    return MemoryIdempotencyStore()
+
+
+class IdempotencyMiddleware():
+    """
+        Replay the First Response of Requests Retried with an Idempotency-Key
+
+        The key is scoped to the method, path and Authorization header. The
+        first request runs the handler and its response, if it's a 2xx or a
+        client error in STORED_CLIENT_ERRORS, is stored; retries get that
+        response back without running the handler, other responses leave the
+        key free for the retry to run again.
+        Reusing a key for a different query/body is rejected with 422, and a
+        retry arriving while the first request is still running gets 409.
+    """
+
+    def __init__(
+        self,
+        app,
+        store=None,
+        methods: Iterable[str] = ("POST",),
+        exclude_paths: Iterable[str] = (),
+    ):
+        self.app = app
+        self.store = store or get_store()
+        self.methods = set(methods)
+        self.exclude_paths = set(exclude_paths)
+
+    async def call_store(self, func, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(func, *args)
+        return func(*args)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            or scope["path"] in self.exclude_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        key = hashlib.sha256(
+            "\n".join([
+                scope["method"],
+                scope["path"],
+                headers.get("authorization", ""),
+                idempotency_key,
+            ]).encode("utf-8")
+        ).hexdigest()
+        fingerprint = hashlib.blake2b(
+            scope.get("query_string", b"") + b"\n" + body,
+            digest_size=16
+        ).hexdigest()
+
+        record = await self.call_store(self.store.reserve, key, fingerprint)
+        if record:
+            await self.replay(record, fingerprint, send)
+            return
+
+        response = {"status": 500, "headers": [], "body": b""}
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except Exception:
+            await self.call_store(self.store.discard, key)
+            raise
+
+        if is_final(response["status"]):
+            await self.call_store(self.store.save, key, response)
+        else:
+            await self.call_store(self.store.discard, key)
+
+    async def replay(self, record: dict, fingerprint: str, send):
+        if record["fingerprint"] != fingerprint:
+            await send_json(send, 422, {
+                "detail": "Idempotency-Key Was Already Used for A Different Request!"
+            })
+            return
+
+        if record["state"] == "pending":
+            await send_json(send, 409, {
+                "detail": "A Request with This Idempotency-Key Is Still in Progress!"
+            }, [(b"retry-after", b"1")])
+            return
+
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in record["headers"]
+        ]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({
+            "type": "http.response.start",
+            "status": record["status"],
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": bytes(record["body"])})
+
+
+def is_final(status: int) -> bool:
+    """
+        Whether A Retry Should Get This Response Instead of Running Again
+    """
+    return 200 <= status < 300 or status in STORED_CLIENT_ERRORS
+
+
+async def read_body(receive) -> bytes:
+    """
+        Read the Whole Request Body
+    """
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def send_json(send, status: int, content: dict, headers: list = ()):
+    body = json.dumps(content).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,8 +1,25 @@
-from fastapi import FastAPI
+import logging
+
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from pymongo.errors import ConnectionFailure
 
+import db_config
+import metrics
+import scheduler
+from admission import AdmissionMiddleware, admissionRouter
 from Authentication.router import authRouter
 from Shop.router import shopRouter
+from Shop import crud as shop_crud
+from Shop import recommendations
+from Analytics import crud as analytics_crud
+from Analytics.router import analyticsRouter
+from compression import CompressionMiddleware
+from idempotency import IdempotencyMiddleware, get_store
+from logger import RequestIdMiddleware, setup_logging, shutdown_logging
+from profiler import profilerRouter
+from rate_limit import login_limiter
 
 
 app = FastAPI(
@@ -10,7 +27,77 @@ app = FastAPI(
     description="Shopping API"
 )
 
+log = logging.getLogger(__name__)
+
 origins = []
+idempotency_store = get_store()
+
+
+# Background Jobs
+# (Exclusive Jobs Run in One Worker at A Time, Not in Every Pre-Forked One)
+scheduler.schedule(60, shop_crud.release_expired_reservations, exclusive=True)
+scheduler.schedule(3600, shop_crud.archive_abandoned_carts, exclusive=True)
+scheduler.schedule(3600, analytics_crud.rebuild_yesterday, exclusive=True)
+if recommendations.RECOMMENDATIONS_INTERVAL:
+    scheduler.schedule(recommendations.RECOMMENDATIONS_INTERVAL, recommendations.build_related, exclusive=True)
+if metrics.METRICS_MULTIPROC_DIR:
+    scheduler.schedule(metrics.METRICS_SNAPSHOT_INTERVAL, metrics.write_snapshot)
+
+# One-Time Data Migrations (Run in the Background, by One Worker, Once)
+scheduler.schedule_migration(shop_crud.migrate_messages)
+scheduler.schedule_migration(shop_crud.migrate_cart_owners)
+# Backfills product_count of Categories Created Before It Was Kept
+scheduler.schedule_migration(shop_crud.rebuild_category_counts)
+
+
+@app.on_event("startup")
+async def startup():
+    """
+        Open the Database Connection (A Missing Config Doesn't Block Booting)
+    """
+    setup_logging()
+    steps = [
+        db_config.get_connection,
+        shop_crud.ensure_indexes,
+        shop_crud.ensure_unique_indexes,
+        analytics_crud.ensure_indexes,
+        recommendations.ensure_indexes,
+    ]
+    if hasattr(idempotency_store, "ensure_indexes"):
+        steps.append(idempotency_store.ensure_indexes)
+    if hasattr(login_limiter.store, "ensure_indexes"):
+        steps.append(login_limiter.store.ensure_indexes)
+
+    # A Failed Step (e.g. Duplicates Blocking A Unique Index) Doesn't Skip the Others
+    for step in steps:
+        try:
+            await run_in_threadpool(step)
+        except Exception as error:
+            if step is not db_config.get_connection and not isinstance(error, ConnectionFailure):
+                log.exception(
+                    "Startup Step Failed",
+                    extra={"step": f"{step.__module__}.{step.__qualname__}"}
+                )
+                continue
+            log.warning("MongoDB Was Not Ready on Startup", extra={"error": str(error)})
+            break
+
+    await scheduler.start()
+    if shop_crud.MESSAGE_INTAKE == "buffered":
+        shop_crud.message_buffer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+        Close the Database Connection
+    """
+    await scheduler.stop()
+    # Flush Buffered Messages Before the Connection Closes
+    await run_in_threadpool(shop_crud.message_buffer.stop)
+    db_config.close_connection()
+    metrics.write_snapshot()
+    shutdown_logging()
 
 
 @app.get("/", tags=["index"])
@@ -20,10 +107,24 @@ async def index():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """
+        Prometheus Scrape Endpoint (Merged across Workers)
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Authentication API
 app.include_router(authRouter)
 # Shop API
 app.include_router(shopRouter)
+# Sales Analytics API (Admin Only)
+app.include_router(analyticsRouter)
+# Sampling Profiler (Admin Only)
+app.include_router(profilerRouter)
+# Admission Control State (Admin Only)
+app.include_router(admissionRouter)
 # Image Uploader API with Arvan Cloud
 # app.include_router(uploadRouter)
 
@@ -36,3 +137,37 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+
+# Replay Responses of Retried POSTs Carrying An Idempotency-Key
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    methods=["POST"],
+    # Multipart Uploads Are Not Buffered; Login Responses Carry Tokens
+    exclude_paths=["/shop/products/image", "/shop/cart/invoice", "/user/auth/login"],
+)
+
+# Compress Catalog and Cart Payloads (Catalog Pages Are Cached Compressed)
+app.add_middleware(
+    CompressionMiddleware,
+    paths=["/shop/products", "/shop/category", "/shop/carts", "/user/list"],
+    cacheable_paths=["/shop/products", "/shop/category"],
+)
+
+# Shed Load per Route Class (Inside Metrics, So Rejections Are Counted)
+app.add_middleware(
+    AdmissionMiddleware,
+    classes={
+        "auth": ["/user/auth"],
+        # Long Transfers to S3 or the Database
+        "upload": ["/shop/products/image", "/shop/products/import", "/shop/products/export", "/shop/cart/invoice"],
+        "catalog": ["/shop/products", "/shop/category"],
+        "cart": ["/shop/carts", "/shop/cart", "/shop/cart/invoice/register"],
+    },
+)
+
+# Request ID Correlation for Logs (Outermost, Covers Every Layer Below)
+app.add_middleware(RequestIdMiddleware)
+
+# Per-Route Latency/Throughput Metrics (Outermost, Timed End to End)
+app.add_middleware(metrics.MetricsMiddleware)
@@ -0,0 +1,384 @@
+import os
+import json
+import time
+import fcntl
+from bisect import bisect_left
+from threading import Lock
+from typing import Iterable, Tuple
+
+from decouple import config
+
+
+# Shared Directory for Multi-Worker Deployments (Empty => Single Process)
+METRICS_MULTIPROC_DIR = config("METRICS_MULTIPROC_DIR", default="")
+# Seconds Between Snapshots A Worker Writes for the Others to Merge
+METRICS_SNAPSHOT_INTERVAL = config("METRICS_SNAPSHOT_INTERVAL", default=5, cast=float)
+# Counters and Histograms of Workers That Died, in One File
+METRICS_AGGREGATE_FILE = "dead.json"
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"}
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry():
+    """
+        Counters, Gauges and Histograms Kept as Plain Dicts
+
+        A series is keyed by (name, labels) where labels is a tuple of
+        (label, value) pairs. Counters and gauges are one-slot lists and
+        histograms keep non-cumulative buckets (cumulated only when rendered),
+        so a hot path can hold on to a series and update it in place.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.descriptions = {}
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = Lock()
+
+    def describe(self, name: str, kind: str, description: str):
+        self.descriptions[name] = (kind, description)
+
+    def counter(self, name: str, labels: tuple = ()) -> list:
+        with self.lock:
+            return self.counters.setdefault((name, labels), [0])
+
+    def gauge(self, name: str, labels: tuple = ()) -> list:
+        with self.lock:
+            return self.gauges.setdefault((name, labels), [0])
+
+    def histogram(self, name: str, labels: tuple = ()) -> list:
+        with self.lock:
+            series = self.histograms.get((name, labels))
+            if series is None:
+                # One Slot per Bucket, +Inf, then the Sum
+                series = self.histograms[(name, labels)] = [0] * (len(self.buckets) + 1) + [0.0]
+            return series
+
+    def inc(self, name: str, labels: tuple = (), amount: float = 1):
+        cell = self.counter(name, labels)
+        with self.lock:
+            cell[0] += amount
+
+    def add(self, name: str, labels: tuple = (), amount: float = 1):
+        cell = self.gauge(name, labels)
+        with self.lock:
+            cell[0] += amount
+
+    def observe(self, name: str, labels: tuple, value: float):
+        series = self.histogram(name, labels)
+        with self.lock:
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self) -> dict:
+        """
+            JSON-Serializable Copy of Every Series
+        """
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "buckets": list(self.buckets),
+                "counters": [[name, labels, cell[0]] for (name, labels), cell in self.counters.items()],
+                "gauges": [[name, labels, cell[0]] for (name, labels), cell in self.gauges.items()],
+                "histograms": [[name, labels, list(series)] for (name, labels), series in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+registry.describe("http_requests_total", "counter", "Requests by route, method and status.")
+registry.describe("http_request_errors_total", "counter", "Requests answered with a 5xx status.")
+registry.describe("http_requests_in_flight", "gauge", "Requests currently being handled.")
+registry.describe("http_request_duration_seconds", "histogram", "Request latency by route and method.")
+
+
+# ----------- { Multi-Worker Snapshots } -----------
+def snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, f"{pid}.json")
+
+
+def write_snapshot():
+    """
+        Publish This Worker's Series to the Shared Directory
+    """
+    if not METRICS_MULTIPROC_DIR:
+        return
+    write_atomically(snapshot_path(os.getpid()), registry.snapshot())
+
+
+def write_atomically(path: str, snapshot: dict):
+    with open(f"{path}.tmp", "w") as snapshot_file:
+        json.dump(snapshot, snapshot_file)
+    os.replace(f"{path}.tmp", path)
+
+
+def clear_snapshots():
+    """
+        Remove Snapshots of A Previous Run (Supervisor Startup)
+    """
+    if not METRICS_MULTIPROC_DIR:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    for file_name in os.listdir(METRICS_MULTIPROC_DIR):
+        if file_name.endswith(".json") or file_name.endswith(".json.tmp"):
+            os.remove(os.path.join(METRICS_MULTIPROC_DIR, file_name))
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_snapshot(path: str):
+    try:
+        with open(path) as snapshot_file:
+            return json.load(snapshot_file)
+    except (OSError, ValueError):
+        return None
+
+
+def fold_snapshots(aggregate: dict, dead: list) -> dict:
+    """
+        Add Dead Workers' Counters and Histograms to the Aggregate Snapshot
+
+        The pids folded in are recorded until their files are removed, so a
+        scrape that dies in between doesn't count them twice.
+    """
+    counters = {(name, tuple(map(tuple, labels))): value for name, labels, value in aggregate["counters"]}
+    histograms = {(name, tuple(map(tuple, labels))): series for name, labels, series in aggregate["histograms"]}
+    folded = set(aggregate["folded"])
+    for snapshot in dead:
+        if snapshot["pid"] in folded:
+            continue
+        folded.add(snapshot["pid"])
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        if list(snapshot["buckets"]) != list(aggregate["buckets"]):
+            continue
+        for name, labels, series in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(series))
+            for index, value in enumerate(series):
+                merged[index] += value
+
+    return {
+        "pid": 0,
+        "buckets": aggregate["buckets"],
+        "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+        "gauges": [],
+        "histograms": [[name, labels, series] for (name, labels), series in histograms.items()],
+        "folded": sorted(folded),
+    }
+
+
+def load_snapshots() -> list:
+    """
+        This Worker's Live Series Plus the Latest Snapshot of Every Other Worker
+
+        Counters and histograms of workers that died are still counted, so
+        totals never go backwards: they're folded into one aggregate file and
+        their own files are removed, so a scrape reads one file per live
+        worker plus one. Their gauges are dropped.
+    """
+    snapshots = [registry.snapshot()]
+    if not METRICS_MULTIPROC_DIR or not os.path.isdir(METRICS_MULTIPROC_DIR):
+        return snapshots
+
+    aggregate_path = os.path.join(METRICS_MULTIPROC_DIR, METRICS_AGGREGATE_FILE)
+    # One Scrape at A Time, So A Dead Worker Is Folded (and Counted) Once
+    with open(os.path.join(METRICS_MULTIPROC_DIR, "scrape.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        aggregate = read_snapshot(aggregate_path) or {
+            "pid": 0,
+            "buckets": list(registry.buckets),
+            "counters": [],
+            "gauges": [],
+            "histograms": [],
+            "folded": [],
+        }
+
+        dead = []
+        for file_name in os.listdir(METRICS_MULTIPROC_DIR):
+            if (
+                not file_name.endswith(".json")
+                or file_name in (f"{os.getpid()}.json", METRICS_AGGREGATE_FILE)
+            ):
+                continue
+            snapshot = read_snapshot(os.path.join(METRICS_MULTIPROC_DIR, file_name))
+            if snapshot is None:
+                continue
+            if is_alive(snapshot["pid"]):
+                snapshots.append(snapshot)
+            else:
+                dead.append(snapshot)
+
+        if dead:
+            aggregate = fold_snapshots(aggregate, dead)
+            write_atomically(aggregate_path, aggregate)
+            for snapshot in dead:
+                try:
+                    os.remove(snapshot_path(snapshot["pid"]))
+                except FileNotFoundError:
+                    pass
+            # Their Files Are Gone, and the pids May Be Reused
+            aggregate["folded"] = []
+            write_atomically(aggregate_path, aggregate)
+
+    snapshots.append(aggregate)
+    return snapshots
+
+
+# ----------- { Prometheus Exposition } -----------
+def format_labels(labels: Iterable) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            label,
+            str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        for label, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render() -> str:
+    """
+        All Workers' Series Merged in Prometheus Text Format
+    """
+    counters, gauges, histograms = {}, {}, {}
+    buckets = registry.buckets
+    for snapshot in load_snapshots():
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot["gauges"]:
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+        if list(snapshot["buckets"]) != list(buckets):
+            continue
+        for name, labels, series in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(series))
+            for index, value in enumerate(series):
+                merged[index] += value
+
+    lines = []
+    described = set()
+
+    def header(name: str):
+        if name in described or name not in registry.descriptions:
+            return
+        described.add(name)
+        kind, description = registry.descriptions[name]
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for series in (counters, gauges):
+        for (name, labels), value in sorted(series.items()):
+            header(name)
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+    for (name, labels), series in sorted(histograms.items()):
+        header(name)
+        cumulative = 0
+        for bound, count in zip((*buckets, "+Inf"), series[:-1]):
+            cumulative += count
+            bucket_labels = (*labels, ("le", bound if bound == "+Inf" else repr(float(bound))))
+            lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(series[-1])}")
+        lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware():
+    """
+        Per-Route Latency, Throughput, In-Flight and Error Metrics
+
+        The route label is the route's path template (e.g. `/shop/product/{product_id}`),
+        looked up from the endpoint the router matched, so ids in URLs don't
+        create new series. Unmatched paths share a single label. The series of
+        a (method, route, status) are looked up once and then updated in place;
+        that's safe without the registry lock since only the event loop thread
+        touches them.
+    """
+
+    def __init__(self, app, registry: Registry = registry, exclude_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.registry = registry
+        self.exclude_paths = set(exclude_paths)
+        self.route_paths = None
+        self.in_flight = registry.gauge("http_requests_in_flight")
+        self.series = {}
+
+    def route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        if self.route_paths is None:
+            self.route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self.route_paths.get(endpoint, "<unmatched>")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight[0] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight[0] -= 1
+
+            method = scope["method"]
+            if method not in HTTP_METHODS:
+                # Client-Chosen Verbs Would Make Unbounded Series
+                method = "other"
+            key = (method, scope.get("endpoint"), status)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = self.lookup_series(scope, method, status)
+            duration, requests, errors = series
+            duration[bisect_left(self.registry.buckets, elapsed)] += 1
+            duration[-1] += elapsed
+            requests[0] += 1
+            if errors is not None:
+                errors[0] += 1
+
+    def lookup_series(self, scope, method: str, status: int) -> tuple:
+        labels = (("method", method), ("route", self.route_label(scope)))
+        return (
+            self.registry.histogram("http_request_duration_seconds", labels),
+            self.registry.counter("http_requests_total", (*labels, ("status", status))),
+            self.registry.counter("http_request_errors_total", labels) if status >= 500 else None,
+        )
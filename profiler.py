@@ -0,0 +1,108 @@
+import sys
+import time
+import threading
+from collections import Counter
+
+from fastapi import APIRouter, HTTPException, Query, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+import auth
+
+
+profilerRouter = APIRouter(
+    prefix="/admin",
+    tags=["Profiler"]
+)
+
+security = HTTPBearer()
+auth_handler = auth.Auth()
+
+# Leaf Frames of A Thread That Is Waiting, Not Running
+IDLE_FRAMES = {
+    ("selectors", "select"),
+    # uvloop Waits in C, Right Under asyncio.run()
+    ("asyncio.runners", "run"),
+    ("threading", "wait"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+}
+
+_profile_lock = threading.Lock()
+
+
+def frame_label(code, module: str, labels: dict) -> str:
+    label = labels.get(code)
+    if label is None:
+        label = labels[code] = f"{module}:{code.co_name}".replace(";", ":")
+    return label
+
+
+def sample_stacks(seconds: float, interval: float, include_idle: bool = False) -> Counter:
+    """
+        Sample the Stack of Every Other Thread Every `interval` Seconds
+    """
+    own_thread = threading.get_ident()
+    thread_names = {}
+    labels = {}
+    stacks = Counter()
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+
+            leaf = (frame.f_globals.get("__name__", ""), frame.f_code.co_name)
+            if not include_idle and leaf in IDLE_FRAMES:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code, frame.f_globals.get("__name__", ""), labels))
+                frame = frame.f_back
+
+            if thread_id not in thread_names:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stack.append(thread_names.get(thread_id, str(thread_id)))
+            stacks[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapse(stacks: Counter) -> str:
+    """
+        Collapsed-Stack Format (flamegraph.pl, speedscope, inferno)
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+@profilerRouter.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: int = Query(10, ge=1, le=1000),
+    include_idle: bool = False
+):
+    """
+        Sample This Worker's Threads for N Seconds (Collapsed Stacks)
+    """
+    token = credentials.credentials
+    payload = auth_handler.decode_token(token)
+
+    if payload["user_type"] != "SA":
+        raise HTTPException(
+            status_code=401,
+            detail="Clients Are Not Allowed for This Request!"
+        )
+
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(409, "A Profile Is Already Running on This Worker!")
+    try:
+        # The Sampler Runs in A Worker Thread, the Event Loop Keeps Serving
+        stacks = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000, include_idle)
+    finally:
+        _profile_lock.release()
+
+    return PlainTextResponse(collapse(stacks))
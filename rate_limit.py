@@ -0,0 +1,174 @@
+import math
+import time
+from threading import Lock
+from collections import OrderedDict
+from datetime import datetime
+
+from decouple import config
+from pymongo import ReturnDocument
+
+import metrics
+from db_config import rate_limits_collection
+
+
+def positive(value) -> float:
+    """
+        Config Cast for Rates and Bursts (Zero Would Never Refill)
+    """
+    number = float(value)
+    if number <= 0:
+        raise ValueError(f"Login Rate Limits Must Be Positive, Got {value!r}")
+    return number
+
+
+LOGIN_RATE_BACKEND = config("LOGIN_RATE_BACKEND", default="memory")
+# Attempts A Mobile Gets at Once, and Regains per Minute
+LOGIN_RATE_MOBILE_BURST = config("LOGIN_RATE_MOBILE_BURST", default=5, cast=positive)
+LOGIN_RATE_MOBILE_PER_MINUTE = config("LOGIN_RATE_MOBILE_PER_MINUTE", default=1, cast=positive)
+# Attempts A Client IP Gets at Once, and Regains per Minute (NAT'd Offices Share One)
+LOGIN_RATE_IP_BURST = config("LOGIN_RATE_IP_BURST", default=30, cast=positive)
+LOGIN_RATE_IP_PER_MINUTE = config("LOGIN_RATE_IP_PER_MINUTE", default=30, cast=positive)
+# Extra Tokens A Failed Login Costs, So Guessing Slows Down Faster than Typos
+LOGIN_RATE_FAILURE_COST = config("LOGIN_RATE_FAILURE_COST", default=2, cast=float)
+LOGIN_RATE_MAX_KEYS = config("LOGIN_RATE_MAX_KEYS", default=100000, cast=int)
+
+
+class MemoryRateLimitStore():
+    """
+        Per-Process LRU of Token Buckets (Single Worker or Sticky Clients Only)
+
+        When full, the least recently used bucket is dropped; a dropped bucket
+        comes back full, so size LOGIN_RATE_MAX_KEYS above the keys an attack
+        can cycle through between two attempts of the same key.
+    """
+
+    def __init__(self, max_keys: int = LOGIN_RATE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+    def take(self, key: str, burst: float, rate: float, cost: float = 1, force: bool = False) -> float:
+        """
+            Take `cost` Tokens; Returns 0, or the Seconds Until They Refill
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if force or tokens >= cost:
+                # A Penalty Can Overdraw the Bucket, by One Burst at Most
+                tokens = max(tokens - cost, -burst)
+            else:
+                wait = (cost - tokens) / rate
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def reset(self, key: str):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+
+class MongoRateLimitStore():
+    """
+        Token Buckets Shared by All Workers (One Atomic Update per Take)
+    """
+
+    def ensure_indexes(self):
+        # A Bucket Idle for A Day Is Full Again
+        rate_limits_collection.create_index(
+            [("updated_at", 1)],
+            expireAfterSeconds=86400
+        )
+
+    def take(self, key: str, burst: float, rate: float, cost: float = 1, force: bool = False) -> float:
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = rate_limits_collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        burst,
+                        {"$add": [{"$ifNull": ["$tokens", burst]}, {"$multiply": [elapsed, rate]}]}
+                    ]},
+                    "updated_at": now,
+                }},
+                {"$set": {"allowed": {"$or": [force, {"$gte": ["$tokens", cost]}]}}},
+                {"$set": {"tokens": {"$cond": [
+                    "$allowed",
+                    {"$max": [{"$subtract": ["$tokens", cost]}, -burst]},
+                    "$tokens"
+                ]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / rate
+
+    def reset(self, key: str):
+        rate_limits_collection.delete_one({"_id": key})
+
+
+def get_store():
+    """
+        Rate Limit Store Selected by LOGIN_RATE_BACKEND
+    """
+    if LOGIN_RATE_BACKEND == "mongo":
+        return MongoRateLimitStore()
+    return MemoryRateLimitStore()
+
+
+class LoginRateLimiter():
+    """
+        Token Buckets per Mobile and per Client IP, Checked Before bcrypt
+
+        Every attempt takes a token from both buckets; a failed one takes
+        LOGIN_RATE_FAILURE_COST more, and a successful one refills the
+        mobile's bucket, so a user who mistypes once isn't locked out.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or get_store()
+
+    def check(self, mobile: str, ip: str) -> float:
+        """
+            0 If the Attempt May Go On, Else Seconds to Wait
+        """
+        wait = self.store.take(f"login:ip:{ip}", LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE / 60)
+        if wait:
+            metrics.registry.inc("login_rate_limited_total", (("key", "ip"),))
+            return wait
+        wait = self.store.take(f"login:mobile:{mobile}", LOGIN_RATE_MOBILE_BURST, LOGIN_RATE_MOBILE_PER_MINUTE / 60)
+        if wait:
+            metrics.registry.inc("login_rate_limited_total", (("key", "mobile"),))
+        return wait
+
+    def failed(self, mobile: str, ip: str):
+        if not LOGIN_RATE_FAILURE_COST:
+            return
+        self.store.take(
+            f"login:ip:{ip}", LOGIN_RATE_IP_BURST, LOGIN_RATE_IP_PER_MINUTE / 60,
+            LOGIN_RATE_FAILURE_COST, force=True
+        )
+        self.store.take(
+            f"login:mobile:{mobile}", LOGIN_RATE_MOBILE_BURST, LOGIN_RATE_MOBILE_PER_MINUTE / 60,
+            LOGIN_RATE_FAILURE_COST, force=True
+        )
+
+    def succeeded(self, mobile: str):
+        self.store.reset(f"login:mobile:{mobile}")
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(math.ceil(seconds), 1))
+
+
+metrics.registry.describe("login_rate_limited_total", "counter", "Login attempts rejected before the password check.")
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,148 @@
+import os
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from decouple import config
+from fastapi.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
+
+from db_config import job_leases_collection, migrations_collection
+
+
+log = logging.getLogger(__name__)
+
+# Seconds Before A Migration Whose Worker Died Is Run Again
+MIGRATION_TIMEOUT = config("MIGRATION_TIMEOUT", default=3600, cast=int)
+
+_jobs = []
+_migrations = []
+_tasks: List[asyncio.Task] = []
+
+
+def schedule(interval: float, func: Callable, name: str = "", exclusive: bool = False):
+    """
+        Register A Blocking Function to Run Every `interval` Seconds
+
+        An `exclusive` job runs in one worker at a time (across processes and
+        hosts): each run first takes or renews a lease in MongoDB, and the
+        workers that don't hold it skip the run.
+    """
+    _jobs.append((interval, func, name or func.__name__, exclusive))
+
+
+def schedule_migration(func: Callable, name: str = ""):
+    """
+        Register A One-Time Blocking Function, Run in the Background on Startup
+
+        The first worker to start it records it in the migrations collection;
+        other workers (and later restarts) skip it once it's running or done.
+    """
+    _migrations.append((func, name or func.__name__))
+
+
+def worker_id() -> str:
+    # Read at Call Time, Workers Are Forked after Import
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name: str, ttl: float) -> bool:
+    """
+        Take (or Renew) the Lease of A Job; False While Another Worker Holds It
+    """
+    now = datetime.utcnow()
+    owner = worker_id()
+    try:
+        job_leases_collection.find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def claim_migration(name: str) -> bool:
+    """
+        Mark A Migration Running; False If It's Done or Another Worker Runs It
+    """
+    now = datetime.utcnow()
+    try:
+        migrations_collection.find_one_and_update(
+            {
+                "_id": name,
+                "state": "running",
+                "started_at": {"$lte": now - timedelta(seconds=MIGRATION_TIMEOUT)},
+            },
+            {"$set": {"owner": worker_id(), "started_at": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def finish_migration(name: str, done: bool):
+    if done:
+        migrations_collection.update_one(
+            {"_id": name, "owner": worker_id()},
+            {"$set": {"state": "done", "finished_at": datetime.utcnow()}}
+        )
+    else:
+        # Failed Migrations Run Again on the Next Startup
+        migrations_collection.delete_one({"_id": name, "owner": worker_id(), "state": "running"})
+
+
+async def _run_migration(func: Callable, name: str):
+    try:
+        if not await run_in_threadpool(claim_migration, name):
+            return
+    except Exception:
+        log.exception("Migration Could Not Start", extra={"migration": name})
+        return
+
+    try:
+        await run_in_threadpool(func)
+    except Exception:
+        log.exception("Migration Failed", extra={"migration": name})
+        await run_in_threadpool(finish_migration, name, False)
+        return
+    await run_in_threadpool(finish_migration, name, True)
+    log.info("Migration Done", extra={"migration": name})
+
+
+async def _run_periodically(interval: float, func: Callable, name: str, exclusive: bool):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Renewed Every Run; A Dead Owner's Lease Lapses after Two Intervals
+            if exclusive and not await run_in_threadpool(acquire_lease, name, interval * 2):
+                continue
+            await run_in_threadpool(func)
+        except Exception:
+            log.exception("Periodic Job Failed", extra={"job": name})
+
+
+async def start():
+    """
+        Start All Registered Jobs and Pending Migrations (Application Startup)
+    """
+    for func, name in _migrations:
+        _tasks.append(asyncio.create_task(_run_migration(func, name)))
+    for interval, func, name, exclusive in _jobs:
+        _tasks.append(
+            asyncio.create_task(_run_periodically(interval, func, name, exclusive))
+        )
+
+
+async def stop():
+    """
+        Cancel All Running Jobs (Application Shutdown)
+    """
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
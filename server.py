@@ -1,10 +1,231 @@
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+
 import uvicorn
+from decouple import config
 
-if __name__ == "__main__":
-    uvicorn.run(
+import metrics
+
+
+log = logging.getLogger(__name__)
+
+SERVER_HOST = config("SERVER_HOST", default="0.0.0.0")
+SERVER_PORT = config("SERVER_PORT", default=3000, cast=int)
+# 0 => One Worker per CPU Core
+SERVER_WORKERS = config("SERVER_WORKERS", default=0, cast=int)
+SERVER_LOOP = config("SERVER_LOOP", default="uvloop")
+SERVER_HTTP = config("SERVER_HTTP", default="httptools")
+SERVER_BACKLOG = config("SERVER_BACKLOG", default=2048, cast=int)
+SERVER_KEEP_ALIVE = config("SERVER_KEEP_ALIVE", default=5, cast=int)
+# 0 => Unlimited
+SERVER_LIMIT_CONCURRENCY = config("SERVER_LIMIT_CONCURRENCY", default=0, cast=int)
+SERVER_LIMIT_MAX_REQUESTS = config("SERVER_LIMIT_MAX_REQUESTS", default=0, cast=int)
+SERVER_GRACEFUL_TIMEOUT = config("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int)
+SERVER_LOG_LEVEL = config("SERVER_LOG_LEVEL", default="warning")
+# A Worker Exiting Sooner Counts As A Crash, and Its Respawn Is Delayed
+# 1, 2, 4 ... Seconds (at Most SERVER_RESPAWN_MAX_DELAY)
+SERVER_MIN_WORKER_UPTIME = config("SERVER_MIN_WORKER_UPTIME", default=10, cast=float)
+SERVER_RESPAWN_MAX_DELAY = config("SERVER_RESPAWN_MAX_DELAY", default=30, cast=float)
+# Consecutive Crashes Before the Supervisor Gives Up (0 => Never)
+SERVER_MAX_CRASHES = config("SERVER_MAX_CRASHES", default=10, cast=int)
+
+
+def default_workers() -> int:
+    """
+        One Worker per Available CPU Core
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def build_config(args: argparse.Namespace) -> uvicorn.Config:
+    """
+        Build Uvicorn Configuration
+    """
+    return uvicorn.Config(
         "main:app",
-        host="127.0.0.1",
-        port=3000,
-        reload=True,
-        log_level="error",
+        host=args.host,
+        port=args.port,
+        loop=args.loop,
+        http=args.http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency or None,
+        limit_max_requests=args.limit_max_requests or None,
+        log_level=args.log_level,
+        access_log=False,
+        proxy_headers=True,
+        lifespan="on",
     )
+
+
+class Supervisor():
+    """
+        Pre-Fork Process Manager
+
+        The application (`main:app`) is imported and the listening socket is
+        bound once in the master, then workers are forked and share both.
+        Workers that die are respawned; SIGTERM/SIGINT is forwarded to the
+        workers, which finish their in-flight requests before exiting.
+        Workers that die young (e.g. failing at startup) are respawned with
+        an exponential backoff, and after SERVER_MAX_CRASHES of them in a row
+        the supervisor shuts down instead of fork-looping.
+    """
+
+    def __init__(self, uvicorn_config: uvicorn.Config, workers: int, graceful_timeout: int):
+        self.config = uvicorn_config
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.respawns = []
+        self.crashes = 0
+        self.should_exit = False
+        self.exit_code = 0
+
+    def run(self):
+        metrics.clear_snapshots()
+        # Pre-Fork Loading of main:app
+        self.config.load()
+        sock = self.config.bind_socket()
+
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGINT, self.handle_exit)
+
+        for _ in range(self.workers):
+            self.spawn(sock)
+
+        while not self.should_exit:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                if not self.respawns:
+                    break
+                pid = 0
+            if pid:
+                self.reap(pid)
+            else:
+                time.sleep(0.2)
+
+            now = time.monotonic()
+            while self.respawns and self.respawns[0] <= now and not self.should_exit:
+                self.respawns.pop(0)
+                self.spawn(sock)
+
+        self.shutdown()
+        sock.close()
+        return self.exit_code
+
+    def reap(self, pid: int):
+        """
+            Schedule the Respawn of A Crashed or Recycled (limit_max_requests) Worker
+        """
+        uptime = time.monotonic() - self.children.pop(pid, 0)
+        if uptime >= SERVER_MIN_WORKER_UPTIME:
+            self.crashes = 0
+            delay = 0
+        else:
+            self.crashes += 1
+            if SERVER_MAX_CRASHES and self.crashes >= SERVER_MAX_CRASHES:
+                log.error("Workers Keep Crashing, Shutting Down", extra={"crashes": self.crashes})
+                self.exit_code = 1
+                self.handle_exit(None, None)
+                return
+            delay = min(2 ** (self.crashes - 1), SERVER_RESPAWN_MAX_DELAY)
+        self.respawns.append(time.monotonic() + delay)
+        self.respawns.sort()
+
+    def spawn(self, sock):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+
+        # Worker Process
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            uvicorn.Server(self.config).run(sockets=[sock])
+        finally:
+            os._exit(0)
+
+    def handle_exit(self, sig, frame):
+        self.should_exit = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+    def shutdown(self):
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+
+        # Graceful Timeout Exceeded
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Shopping API Server")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--loop", default=SERVER_LOOP)
+    parser.add_argument("--http", default=SERVER_HTTP)
+    parser.add_argument("--backlog", type=int, default=SERVER_BACKLOG)
+    parser.add_argument("--keep-alive", type=int, default=SERVER_KEEP_ALIVE)
+    parser.add_argument("--limit-concurrency", type=int, default=SERVER_LIMIT_CONCURRENCY)
+    parser.add_argument("--limit-max-requests", type=int, default=SERVER_LIMIT_MAX_REQUESTS)
+    parser.add_argument("--graceful-timeout", type=int, default=SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--log-level", default=SERVER_LOG_LEVEL)
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        help="Development Mode: Single Process with Auto-Reload on 127.0.0.1"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.reload:
+        uvicorn.run(
+            "main:app",
+            host="127.0.0.1",
+            port=args.port,
+            reload=True,
+            log_level="error",
+        )
+        return
+
+    uvicorn_config = build_config(args)
+    workers = args.workers or default_workers()
+
+    # Platforms without fork() Fall Back to A Single Process
+    if workers == 1 or not hasattr(os, "fork"):
+        uvicorn.Server(uvicorn_config).run()
+        return
+
+    return Supervisor(uvicorn_config, workers, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+    Stock Reservations on An In-Memory MongoDB (mongomock)
+
+        python -m pytest tests
+"""
+import os
+import unittest
+from datetime import datetime, timedelta
+
+os.environ.setdefault("JWT_SECRET", "test")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("DB_NAME", "test_reservations")
+
+import mongomock                            # noqa: E402
+from fastapi import FastAPI                 # noqa: E402
+from fastapi.testclient import TestClient   # noqa: E402
+
+import db_config                            # noqa: E402
+from Shop import crud                       # noqa: E402
+from Shop.router import shopRouter          # noqa: E402
+
+
+class ReservationTest(unittest.TestCase):
+
+    def setUp(self):
+        db_config.use_connection(mongomock.MongoClient())
+        crud.products_collection.insert_many([
+            {"id": 1, "title": "product 1", "stock": 5, "sales": 0},
+            {"id": 2, "title": "product 2", "stock": 1, "sales": 0},
+            {"id": 3, "title": "product 3", "stock": 3, "sales": 0},
+        ])
+
+    def stocks(self) -> dict:
+        return {
+            product["id"]: (product["stock"], product.get("pending_reservations", []))
+            for product in crud.products_collection.find({}, {"_id": 0})
+        }
+
+    def test_rejected_reservation_rolls_back_every_line(self):
+        before = self.stocks()
+        reservation = crud.reserve_stock("cart-1", [
+            {"id": 1, "quantity": 2},
+            {"id": 2, "quantity": 3},
+            {"id": 3, "quantity": 1},
+        ])
+
+        self.assertEqual(reservation["status"], "rejected")
+        self.assertEqual(reservation["unavailable"], [2])
+        self.assertEqual(self.stocks(), before)
+        stored = crud.get_reservation(reservation["reservation_id"])
+        self.assertEqual(stored["status"], "rejected")
+        self.assertTrue(stored["settled"])
+
+    def test_held_reservation_takes_all_lines(self):
+        reservation = crud.reserve_stock("cart-1", [
+            {"id": 1, "quantity": 2},
+            {"id": 1, "quantity": 1},
+            {"id": 3, "quantity": 3},
+        ])
+
+        self.assertEqual(reservation["status"], "held")
+        stocks = self.stocks()
+        self.assertEqual(stocks[1][0], 2)
+        self.assertEqual(stocks[3][0], 0)
+
+        crud.release_reservation(reservation["reservation_id"])
+        self.assertEqual(
+            {product_id: stock for product_id, (stock, _) in self.stocks().items()},
+            {1: 5, 2: 1, 3: 3}
+        )
+
+    def test_reserving_again_replaces_the_carts_hold(self):
+        first = crud.reserve_stock("cart-1", [{"id": 1, "quantity": 2}])
+        second = crud.reserve_stock("cart-1", [{"id": 1, "quantity": 3}])
+
+        self.assertEqual(second["status"], "held")
+        self.assertEqual(crud.get_reservation(first["reservation_id"])["status"], "replaced")
+        self.assertEqual(crud.products_collection.find_one({"id": 1})["stock"], 2)
+
+        self.assertIsNone(crud.release_reservation(second["reservation_id"], cart_index="cart-2"))
+        crud.release_reservation(second["reservation_id"], cart_index="cart-1")
+        self.assertEqual(crud.products_collection.find_one({"id": 1})["stock"], 5)
+
+    def test_malformed_line_touches_no_stock(self):
+        before = self.stocks()
+        with self.assertRaises(ValueError):
+            crud.reserve_stock("cart-1", [{"id": 1, "quantity": 1}, {"quantity": 2}])
+        with self.assertRaises(ValueError):
+            crud.reserve_stock("cart-1", [{"id": 1, "quantity": "two"}])
+        self.assertEqual(self.stocks(), before)
+
+    def test_claim_is_scoped_to_the_reserving_cart(self):
+        reservation = crud.reserve_stock("cart-1", [{"id": 1, "quantity": 2}])
+
+        self.assertIsNone(crud.claim_reservation(reservation["reservation_id"], "cart-2"))
+        self.assertIsNotNone(crud.claim_reservation(reservation["reservation_id"], "cart-1"))
+        self.assertIsNotNone(crud.commit_reservation(reservation["reservation_id"]))
+        product = crud.products_collection.find_one({"id": 1})
+        self.assertEqual((product["stock"], product["sales"]), (3, 2))
+        self.assertEqual(product["pending_reservations"], [])
+
+    def test_expired_reservation_cannot_be_claimed(self):
+        reservation = crud.reserve_stock("cart-1", [{"id": 1, "quantity": 2}], ttl=-1)
+        crud.release_expired_reservations()
+
+        self.assertIsNone(crud.claim_reservation(reservation["reservation_id"], "cart-1"))
+        self.assertEqual(crud.products_collection.find_one({"id": 1})["stock"], 5)
+
+    def test_claim_outlives_expiry_until_released(self):
+        reservation = crud.reserve_stock("cart-1", [{"id": 1, "quantity": 2}])
+        crud.claim_reservation(reservation["reservation_id"], "cart-1")
+        crud.reservations_collection.update_one(
+            {"reservation_id": reservation["reservation_id"]},
+            {"$set": {"expires_at": datetime.utcnow() - timedelta(minutes=5)}}
+        )
+        crud.release_expired_reservations()
+        self.assertEqual(crud.products_collection.find_one({"id": 1})["stock"], 3)
+
+        crud.release_reservation(reservation["reservation_id"], claimed=True)
+        self.assertEqual(crud.products_collection.find_one({"id": 1})["stock"], 5)
+
+
+class RegisterTest(unittest.TestCase):
+
+    def setUp(self):
+        db_config.use_connection(mongomock.MongoClient())
+        crud.products_collection.insert_one(
+            {"id": 1, "title": "product 1", "unit_price": 100, "stock": 2, "sales": 0}
+        )
+        app = FastAPI()
+        app.include_router(shopRouter)
+        self.client = TestClient(app)
+        self.cart_index = self.client.get("/shop/carts/new").json()["cart_index"]
+
+    def update_cart(self, quantity: int):
+        self.client.post(
+            "/shop/carts/update",
+            params={"cart_index": self.cart_index},
+            json=[{"id": 1, "title": "product 1", "unit_price": 100, "quantity": quantity}]
+        )
+
+    def test_cart_changed_after_reserving_is_not_registered(self):
+        self.update_cart(1)
+        reservation = self.client.post(
+            "/shop/cart/reserve", params={"cart_index": self.cart_index}
+        ).json()
+        self.update_cart(5)
+
+        response = self.client.post("/shop/cart/invoice/register", json={
+            "cart_index": self.cart_index,
+            "reservation_id": reservation["reservation_id"],
+            "first_name": "first",
+            "last_name": "last",
+            "mobile": "09120000000",
+            "province": "province",
+            "city": "city",
+            "details": "details",
+            "zip_code": "1234567890",
+            "invoice": "invoice",
+        })
+
+        self.assertEqual(response.status_code, 409)
+        product = crud.products_collection.find_one({"id": 1})
+        self.assertEqual((product["stock"], product["sales"]), (2, 0))
+        self.assertEqual(crud.invoices_collection.count_documents({}), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()